@@ -15,3 +15,33 @@ python3 -m src.cli \
 done
 EOF
 
+
+# Record (depends_on, preferred_time, energy_level, recurrence) phải giữ nguyên qua vòng output -> parser (daemon trả record rồi nhận lại qua add_tasks)
+python3 - <<PY
+from src.utils.output import task_to_record
+from src.utils.parser import parse_task_line, task_from_dict
+task = parse_task_line("9,Review,30,LOW,,morning,high,,,,3 12,FREQ=WEEKLY;BYDAY=MO,WE")
+assert task.depends_on == [3, 12] and task.recurrence is not None, task.depends_on
+assert task_from_dict(task_to_record(task)).depends_on == [3, 12]
+assert task_to_record(task_from_dict(task_to_record(task))) == task_to_record(task)
+assert task_from_dict({"id": 1, "duration_minutes": 30, "depends_on": "3, 12"}).depends_on == [3, 12]
+print("record round-trip OK")
+PY
+
+# Task quá hạn với ngày đã qua: best_slot (có early exit) phải trùng với argmax của score_slot
+python3 - <<PY
+import datetime
+from src.models import Task, Priority, TimeSlot
+from src.scheduler import SlotScorer
+day = datetime.datetime(2025, 9, 15)
+scorer = SlotScorer({"work_start_hour": 8, "work_end_hour": 18})
+scorer.clock = lambda: day + datetime.timedelta(days=10)
+slots = [TimeSlot(day + datetime.timedelta(hours=h), day + datetime.timedelta(hours=h + 1)) for h in range(8, 18)]
+for i in range(30):
+    task = Task(id=i, description="overdue", duration_minutes=30, priority=list(Priority)[i % 4],
+                due_date=day - datetime.timedelta(days=i % 5, hours=i), energy_level=["low", "high", None][i % 3])
+    scores = [scorer.score_slot(slot, task).total for slot in slots]
+    best, best_score = scorer.best_slot(slots, task)
+    assert best is slots[scores.index(max(scores))] and best_score == max(scores), (i, best, best_score, max(scores))
+print("overdue best_slot OK")
+PY
@@ -0,0 +1,322 @@
+"""
+Differential equivalence and performance harness.
+
+Runs identical seeded workloads through every registered engine, diffs the
+resulting placements and reference score totals against a baseline engine and
+reports the speedup. Usage:
+
+    python -m src.benchmarks.equivalence --seeds 1 2 3 --tasks 200 --days 2
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import random
+import sys
+import time
+import types
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src import test as legacy
+from src.models import Task, TimeSlot, Priority
+from src.scheduler import scheduler123
+from src.scheduler.AIScheduler import AIScheduler
+from src.scheduler.BatchScheduler import BatchScheduler
+from src.scheduler.ScheduleCache import ScheduleCache
+from src.scheduler.StreamingScheduler import StreamingScheduler
+from src.scheduler.SlotScorer import SlotScorer
+
+Placement = Optional[Tuple[datetime.datetime, datetime.datetime]]
+
+DEFAULT_SETTINGS = {
+    "work_start_hour": 8,
+    "work_end_hour": 20,
+    "min_buffer_minutes": 15,
+    "slot_duration_minutes": 30,
+    "group_by_project": True,
+}
+
+
+class EngineSpec:
+    """
+    Một engine được đăng ký trong harness.
+    `runner(settings, task_specs, dates)` must return {task_id: (start, end) | None}.
+    Engines registered with expect_equivalent=False are reported but never fail the run.
+    """
+    def __init__(self, name: str, runner: Callable, expect_equivalent: bool = True, note: str = ""):
+        self.name = name
+        self.runner = runner
+        self.expect_equivalent = expect_equivalent
+        self.note = note
+
+
+ENGINES: Dict[str, EngineSpec] = {}
+
+def register_engine(name: str, runner: Callable, expect_equivalent: bool = True, note: str = ""):
+    ENGINES[name] = EngineSpec(name, runner, expect_equivalent, note)
+
+
+# --- Workloads ---
+
+def generate_workload(seed: int, n_tasks: int, start_date: datetime.datetime) -> List[Dict]:
+    """
+    Sinh danh sách task spec (dict) có thể tái lập từ seed. Specs are plain dicts so every
+    engine builds its own Task objects from identical inputs.
+    """
+    rng = random.Random(seed)
+    specs = []
+    for i in range(1, n_tasks + 1):
+        spec = {
+            "id": i,
+            "description": f"task-{seed}-{i}",
+            "duration_minutes": rng.choice([15, 30, 45, 60, 60, 90, 120]),
+            "priority": rng.choice(["LOW", "MEDIUM", "MEDIUM", "HIGH", "CRITICAL"]),
+            "due_date": None,
+            "preferred_time": rng.choice([None, None, "morning", "afternoon", "evening"]),
+            "energy_level": rng.choice([None, "low", "medium", "high"]),
+            "project_id": rng.choice([None, None, "A", "B", "C"]),
+            "scheduled_start": None,
+            "scheduled_end": None,
+        }
+        if rng.random() < 0.6:
+            spec["due_date"] = start_date + datetime.timedelta(hours=rng.randint(-48, 24 * 7))
+        if rng.random() < 0.05:
+            fixed_start = start_date + datetime.timedelta(hours=rng.randint(8, 18))
+            spec["scheduled_start"] = fixed_start
+            spec["scheduled_end"] = fixed_start + datetime.timedelta(minutes=spec["duration_minutes"])
+        specs.append(spec)
+    return specs
+
+def build_tasks(specs: List[Dict], task_cls=Task, priority_cls=Priority) -> List:
+    tasks = []
+    for spec in specs:
+        fields = dict(spec)
+        fields["priority"] = priority_cls[spec["priority"]]
+        tasks.append(task_cls(**fields))
+    return tasks
+
+def collect_placements(tasks) -> Dict[int, Placement]:
+    return {
+        task.id: (task.scheduled_start, task.scheduled_end) if task.scheduled_start else None
+        for task in tasks
+    }
+
+
+# --- Engines ---
+
+def run_current(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    scheduler = AIScheduler(settings=dict(settings))
+    for task in build_tasks(specs):
+        scheduler.add_task(task)
+    for date in dates:
+        scheduler.schedule_tasks(target_date=date)
+    return collect_placements(scheduler.iter_all_tasks())
+
+def run_cached(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    # Lượt đầu điền cache, lượt thứ hai (scheduler mới, cùng input) chỉ đọc từ cache
+    cache = ScheduleCache()
+    for _ in range(2):
+        scheduler = AIScheduler(settings=dict(settings), result_cache=cache)
+        for task in build_tasks(specs):
+            scheduler.add_task(task)
+        for date in dates:
+            scheduler.schedule_tasks(target_date=date)
+    return collect_placements(scheduler.iter_all_tasks())
+
+def run_batch(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    batch = BatchScheduler()
+    result = batch.schedule_user("bench", dict(settings), build_tasks(specs), dates[0], len(dates))
+    return collect_placements(result.scheduled + result.unscheduled)
+
+def run_streaming(settings: Dict, specs: List[Dict], dates: List[datetime.datetime],
+                  top_k: int = 1 << 30) -> Dict[int, Placement]:
+    streaming = StreamingScheduler(dict(settings), top_k=top_k)
+    return collect_placements(task for _, task in streaming.schedule(iter(build_tasks(specs)), dates[0], len(dates)))
+
+def run_streaming_top32(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    return run_streaming(settings, specs, dates, top_k=32)
+
+def run_gap_placement(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    return run_current(dict(settings, placement="gap"), specs, dates)
+
+def run_scheduler123(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    scheduler = AIScheduler(settings=dict(settings))
+    scheduler.calendar_manager = scheduler123.CalendarManager(
+        work_start_hour=settings.get("work_start_hour", 9),
+        work_end_hour=settings.get("work_end_hour", 17),
+        buffer_minutes=settings.get("min_buffer_minutes", 15),
+    )
+    scheduler.slot_scorer = scheduler123.SlotScorer(dict(settings))
+    for task in build_tasks(specs):
+        scheduler.add_task(task)
+    for date in dates:
+        scheduler.schedule_tasks(target_date=date)
+    return collect_placements(scheduler.tasks)
+
+def run_todolist(settings: Dict, specs: List[Dict], dates: List[datetime.datetime]) -> Dict[int, Placement]:
+    scheduler = legacy.TodoListAIScheduler(settings=dict(settings))
+    for task in build_tasks(specs, legacy.Task, legacy.Priority):
+        scheduler.add_task(task)
+    # Engine cũ print từng task; bỏ output để không đo I/O của terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        for date in dates:
+            scheduler.schedule_tasks(target_date=date)
+    return collect_placements(scheduler.tasks)
+
+register_engine("current", run_current, note="src/scheduler/AIScheduler.py")
+register_engine("cached", run_cached, note="AIScheduler with ScheduleCache; timing covers a miss run plus a hit run")
+register_engine("batch", run_batch, note="BatchScheduler with shared slot templates and DayProfile")
+register_engine("streaming", run_streaming, note="StreamingScheduler with an unbounded heap")
+register_engine("streaming_top32", run_streaming_top32, expect_equivalent=False,
+                note="StreamingScheduler, top_k=32: each day is planned in rounds of 32 candidates")
+register_engine("gap", run_gap_placement, expect_equivalent=False,
+                note="AIScheduler with placement='gap': best start inside free gaps instead of hourly slots")
+register_engine("scheduler123", run_scheduler123,
+                note="AIScheduler loop with the scheduler123.py CalendarManager/SlotScorer")
+register_engine("todolist", run_todolist, expect_equivalent=False,
+                note="src/test.py: sorts (priority, due_date) descending, so later deadlines go first")
+
+
+# --- Clock ---
+
+# Các module chấm điểm đọc "now" qua datetime.datetime.now(); SlotScorer.clock cũng lấy từ đó khi khởi tạo
+CLOCK_MODULES = ("src.scheduler.SlotScorer", "src.scheduler.scheduler123", "src.test")
+
+@contextlib.contextmanager
+def frozen_clock(now: datetime.datetime):
+    """
+    Cố định datetime.now() của mọi engine trong harness, để kết quả không phụ thuộc ngày chạy.
+    Each module in CLOCK_MODULES gets a copy of the datetime module whose datetime.now() returns
+    `now`; the originals are restored on exit.
+    """
+    class FrozenDateTime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now if tz is None else now.astimezone(tz)
+
+    shim = types.ModuleType("datetime")
+    shim.__dict__.update(datetime.__dict__)
+    shim.datetime = FrozenDateTime
+    modules = [sys.modules[name] for name in CLOCK_MODULES if name in sys.modules]
+    originals = [module.datetime for module in modules]
+    for module in modules:
+        module.datetime = shim
+    try:
+        yield
+    finally:
+        for module, original in zip(modules, originals):
+            module.datetime = original
+
+
+# --- Comparison ---
+
+def reference_score(specs: List[Dict], placements: Dict[int, Placement], settings: Dict) -> float:
+    """
+    Tổng điểm của các vị trí cuối cùng, chấm bằng cùng một SlotScorer cho mọi engine.
+    """
+    scorer = SlotScorer(dict(settings))
+    total = 0.0
+    for task in build_tasks(specs):
+        placement = placements.get(task.id)
+        if placement:
+            total += scorer.score_slot(TimeSlot(placement[0], placement[1]), task).total
+    return total
+
+def diff_placements(baseline: Dict[int, Placement], other: Dict[int, Placement]) -> List[int]:
+    return sorted(task_id for task_id in baseline.keys() | other.keys()
+                  if baseline.get(task_id) != other.get(task_id))
+
+def time_engine(engine: EngineSpec, settings: Dict, specs: List[Dict], dates, repeat: int):
+    best = float("inf")
+    placements = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        placements = engine.runner(settings, specs, dates)
+        best = min(best, time.perf_counter() - started)
+    return placements, best
+
+def compare_engines(seeds: List[int], n_tasks: int, days: int, engine_names: List[str],
+                    baseline: str = "current", settings: Optional[Dict] = None,
+                    start_date: Optional[datetime.datetime] = None, repeat: int = 1,
+                    now: Optional[datetime.datetime] = None) -> List[Dict]:
+    """
+    Chạy mọi engine trên cùng workload cho từng seed và trả về một dict kết quả cho mỗi (seed, engine).
+    Every engine sees the same frozen "now" (default: 00:00 of `start_date`).
+    """
+    settings = dict(settings or DEFAULT_SETTINGS)
+    if start_date is None:
+        start_date = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    with frozen_clock(now if now is not None else start_date):
+        return run_comparison(seeds, n_tasks, engine_names, baseline, settings, start_date, days, repeat)
+
+def run_comparison(seeds: List[int], n_tasks: int, engine_names: List[str], baseline: str, settings: Dict,
+                   start_date: datetime.datetime, days: int, repeat: int) -> List[Dict]:
+    dates = [start_date + datetime.timedelta(days=offset) for offset in range(days)]
+    names = [baseline] + [name for name in engine_names if name != baseline]
+    results = []
+    for seed in seeds:
+        specs = generate_workload(seed, n_tasks, start_date)
+        base_placements, base_seconds = time_engine(ENGINES[baseline], settings, specs, dates, repeat)
+        base_score = reference_score(specs, base_placements, settings)
+        for name in names:
+            engine = ENGINES[name]
+            if name == baseline:
+                placements, seconds = base_placements, base_seconds
+            else:
+                placements, seconds = time_engine(engine, settings, specs, dates, repeat)
+            score = reference_score(specs, placements, settings)
+            differing = diff_placements(base_placements, placements)
+            results.append({
+                "seed": seed,
+                "engine": name,
+                "seconds": seconds,
+                "speedup": base_seconds / seconds if seconds > 0 else float("inf"),
+                "placed": sum(1 for p in placements.values() if p),
+                "score_total": score,
+                "score_delta": score - base_score,
+                "differing_tasks": differing,
+                "expect_equivalent": engine.expect_equivalent,
+                "equivalent": not differing,
+            })
+    return results
+
+def format_report(results: List[Dict], baseline: str) -> str:
+    lines = [f"baseline: {baseline}",
+             "seed  engine           seconds   speedup  placed   score_total   score_delta  diffs  status"]
+    for r in results:
+        if r["equivalent"]:
+            status = "ok"
+        elif r["expect_equivalent"]:
+            status = "MISMATCH"
+        else:
+            status = "divergent (expected)"
+        lines.append(f"{r['seed']:<5} {r['engine']:<15} {r['seconds']:>8.4f} {r['speedup']:>8.2f}x "
+                     f"{r['placed']:>6} {r['score_total']:>13.3f} {r['score_delta']:>+13.3f} "
+                     f"{len(r['differing_tasks']):>6}  {status}")
+    return "\n".join(lines)
+
+def main(raw_args=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare scheduling engines on seeded workloads")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--engines", nargs="+", default=None, help=f"Default: all ({', '.join(ENGINES)})")
+    parser.add_argument("--baseline", default="current")
+    parser.add_argument("--date", default=None, help="First day (YYYY-MM-DD), default today")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per engine; the fastest is reported")
+    parser.add_argument("--now", default=None, help="Frozen current time for every engine (ISO), default 00:00 of --date")
+    args = parser.parse_args(raw_args)
+
+    start_date = datetime.datetime.fromisoformat(args.date) if args.date else None
+    now = datetime.datetime.fromisoformat(args.now) if args.now else None
+    results = compare_engines(args.seeds, args.tasks, args.days, args.engines or list(ENGINES),
+                              baseline=args.baseline, start_date=start_date, repeat=args.repeat, now=now)
+    print(format_report(results, args.baseline))
+    mismatches = [r for r in results if r["expect_equivalent"] and not r["equivalent"]]
+    for r in mismatches:
+        print(f"seed {r['seed']} {r['engine']}: placements differ for task ids {r['differing_tasks'][:20]}",
+              file=sys.stderr)
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
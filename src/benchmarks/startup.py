@@ -0,0 +1,86 @@
+"""
+Startup-time benchmark for the CLI.
+
+Runs fresh interpreters and reports the best and median wall time of a bare
+interpreter, `import src.cli` and `python -m src.cli --help`, the import cost
+on top of the bare interpreter, and the slowest modules from `-X importtime`.
+With --budget_ms the run fails (exit 1) when the import cost of src.cli is over
+budget. Usage:
+
+    python -m src.benchmarks.startup --runs 20 --budget_ms 50
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+COMMANDS = {
+    "python": ["-c", "pass"],
+    "import src.cli": ["-c", "import src.cli"],
+    "python -m src.cli --help": ["-m", "src.cli", "--help"],
+}
+
+
+def time_command(args: List[str], cwd: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+def import_profile(module: str, cwd: str, top: int = 10) -> List[Tuple[int, str]]:
+    """
+    (cumulative microseconds, module) của `top` module chậm nhất khi import `module`, theo -X importtime.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        rows.append((int(parts[1]), parts[2].rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def run_benchmark(runs: int, cwd: str) -> Dict[str, List[float]]:
+    # Chạy xen kẽ để nhiễu của máy chia đều cho các lệnh
+    timings: Dict[str, List[float]] = {name: [] for name in COMMANDS}
+    for _ in range(max(1, runs)):
+        for name, args in COMMANDS.items():
+            timings[name].append(time_command(args, cwd))
+    return timings
+
+def format_report(timings: Dict[str, List[float]], profile: List[Tuple[int, str]]) -> str:
+    bare = min(timings["python"])
+    lines = ["command                        best_ms  median_ms  over_python_ms"]
+    for name, values in timings.items():
+        lines.append(f"{name:<30} {min(values) * 1000:>7.1f} {statistics.median(values) * 1000:>10.1f} "
+                     f"{(min(values) - bare) * 1000:>15.1f}")
+    lines.append("")
+    lines.append("slowest imports (cumulative, import src.cli)")
+    for micros, module in profile:
+        lines.append(f"  {micros / 1000:>7.1f} ms  {module}")
+    return "\n".join(lines)
+
+
+def main(raw_args=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure CLI startup and import time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget_ms", type=float, default=None,
+                        help="Fail if `import src.cli` costs more than this over a bare interpreter (best run)")
+    args = parser.parse_args(raw_args)
+
+    cwd = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    timings = run_benchmark(args.runs, cwd)
+    print(format_report(timings, import_profile("src.cli", cwd)))
+    if args.budget_ms is not None:
+        cost_ms = (min(timings["import src.cli"]) - min(timings["python"])) * 1000
+        if cost_ms > args.budget_ms:
+            print(f"import src.cli costs {cost_ms:.1f} ms, over the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,170 @@
 import datetime
-from src.scheduler import AIScheduler
-from src.utils import parse_args, parse_tasks
+import sys
+from src.utils import build_arg_parser, settings_from_args, iter_tasks
 
+OUTPUT_BUFFER_BYTES = 1 << 16
 
-def run_cli():
+
+def open_input(path: str):
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8")
+
+def open_output(path: str):
+    # Một writer có buffer lớn duy nhất cho toàn bộ kết quả
+    if path == "-":
+        sys.stdout.flush()
+        return open(sys.stdout.fileno(), "w", encoding="utf-8", newline="",
+                    buffering=OUTPUT_BUFFER_BYTES, closefd=False)
+    return open(path, "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_BYTES)
+
+def make_event_sink(args):
+    if not args.events:
+        return None
+    from src.scheduler import JsonLinesSink, LEVEL_NAMES
+    level = LEVEL_NAMES[args.event_level]
+    if args.events == "-":
+        return JsonLinesSink(sys.stderr, level=level)
+    return JsonLinesSink(open(args.events, "w", encoding="utf-8", buffering=OUTPUT_BUFFER_BYTES),
+                         level=level, close_stream=True)
+
+def write_output(tasks, output, output_format: str, localize=None) -> int:
+    # Exporter chỉ được import khi thực sự cần
+    if output_format == "ics":
+        from src.utils import write_ics
+        return write_ics(tasks, output, localize=localize)
+    from src.utils import write_results
+    return write_results(tasks, output, output_format, localize=localize)
+
+def import_busy_files(paths, target, start_date: datetime.datetime, end_date: datetime.datetime):
+    if not paths:
+        return
+    from src.utils import import_ics_busy
+    for path in paths:
+        import_ics_busy(path, target, start_date, end_date)
+
+def batch_window(args, timezone=None):
+    if args.date:
+        start_date = datetime.datetime.fromisoformat(args.date)
+    else:
+        # Hôm nay theo múi giờ của user nếu có --timezone
+        start_date = timezone.now() if timezone is not None else datetime.datetime.now()
+    start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    days = max(1, args.days)
+    return start_date, days, start_date + datetime.timedelta(days=days)
+
+def run_streaming_batch(args, scheduler_settings) -> int:
+    """
+    Batch mode với --top_k: task được đọc và ghi ra theo luồng, bộ nhớ chỉ giữ top-K ứng viên mỗi ngày.
+    Output rows are in emission order (fixed, then each day's placements, then unplaced).
+    """
+    from src.scheduler import StreamingScheduler
+    streaming = StreamingScheduler(settings=scheduler_settings, top_k=args.top_k)
+    timezone = streaming.timezone
+    start_date, days, end_date = batch_window(args, timezone)
+    if timezone is not None:
+        timezone.prepare(start_date, end_date)
+    import_busy_files(args.busy, streaming, start_date, end_date)
+    source = open_input(args.tasks)
+    output = open_output(args.output)
+    try:
+        results = (task for _, task in streaming.schedule(iter_tasks(source), start_date, days))
+        if args.output_format == "ics":
+            results = (task for task in results
+                       if task.scheduled_start is not None and start_date <= task.scheduled_start < end_date)
+        return write_output(results, output, args.output_format,
+                            localize=timezone.attach if timezone is not None else None)
+    finally:
+        output.close()
+        if source is not sys.stdin:
+            source.close()
+        if args.profile:
+            print(f"streaming: {streaming.stats}", file=sys.stderr)
+
+def run_batch(args, scheduler_settings) -> int:
+    """
+    Non-interactive mode: read all tasks from --tasks, schedule --days days starting at --date,
+    and write every task (scheduled or not) to --output in --format. No per-task console output
+    unless --events asks for it.
+    """
+    if args.top_k:
+        return run_streaming_batch(args, scheduler_settings)
+    from src.scheduler import AIScheduler
+    event_sink = make_event_sink(args)
+    result_cache = None
+    if args.cache:
+        from src.scheduler import ScheduleCache
+        result_cache = ScheduleCache(path=args.cache)
+    decision_log = None
+    if args.decision_log:
+        from src.scheduler import DecisionLog
+        decision_log = DecisionLog(open(args.decision_log, "a", encoding="utf-8", buffering=OUTPUT_BUFFER_BYTES),
+                                   user=scheduler_settings.get("weights_user"), close_stream=True)
+    scheduler = AIScheduler(settings=scheduler_settings, event_sink=event_sink, result_cache=result_cache,
+                            decision_log=decision_log)
+    if args.profile:
+        scheduler.enable_profiling()
+    source = open_input(args.tasks)
+    try:
+        for task in iter_tasks(source):
+            scheduler.add_task(task)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if args.validate:
+        report = scheduler.validate_fixed_tasks(merge_conflicts=args.validate == "merge")
+        if not report.ok:
+            print(report.report(), file=sys.stderr)
+
+    start_date, days, end_date = batch_window(args, scheduler.timezone)
+    if scheduler.timezone is not None:
+        # Tính sẵn bảng offset cho cả horizon
+        scheduler.timezone.prepare(start_date, end_date)
+    import_busy_files(args.busy, scheduler.calendar_manager, start_date, end_date)
+    if args.capacity_report:
+        print(scheduler.check_capacity(start_date, days).report(), file=sys.stderr)
+    for offset in range(days):
+        scheduler.schedule_tasks(target_date=start_date + datetime.timedelta(days=offset))
+
+    if event_sink is not None:
+        event_sink.close()
+    if decision_log is not None:
+        decision_log.close()
+    if result_cache is not None:
+        result_cache.save()
+
+    output = open_output(args.output)
+    try:
+        if args.output_format == "ics":
+            return write_output(scheduler.iter_scheduled_between(start_date, end_date), output, "ics",
+                                localize=scheduler.to_aware)
+        return write_output(scheduler.iter_all_tasks(), output, args.output_format, localize=scheduler.to_aware)
+    finally:
+        output.close()
+        if scheduler.stats is not None:
+            print(scheduler.stats.report(), file=sys.stderr)
+            if result_cache is not None:
+                print(f"cache: {result_cache.get_stats()}", file=sys.stderr)
+
+def run_cli(raw_args=None):
     # Parse scheduling settings from CLI args
-    scheduler_settings = parse_args()
-    scheduler = AIScheduler(settings=scheduler_settings)
+    args = build_arg_parser().parse_args(raw_args)
+    scheduler_settings = settings_from_args(args)
+    if args.tasks:
+        from src.scheduler import DependencyCycleError
+        try:
+            run_batch(args, scheduler_settings)
+        except DependencyCycleError as exc:
+            print(f"{exc} (check depends_on in the task input)", file=sys.stderr)
+            return 1
+        return 0
+
+    from src.scheduler import AIScheduler, ConsoleSink, DependencyCycleError
+    from src.utils import parse_tasks
+    scheduler = AIScheduler(settings=scheduler_settings, event_sink=ConsoleSink())
+    if args.profile:
+        scheduler.enable_profiling()
 
     # Input tasks interactively or from file
     print("Enter tasks:")
@@ -29,8 +187,12 @@ def run_cli():
 
     for task in tasks:
         scheduler.add_task(task)
-    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    scheduler.schedule_tasks(target_date=today)
+    today = scheduler.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        scheduler.schedule_tasks(target_date=today)
+    except DependencyCycleError as exc:
+        print(f"{exc} (check depends_on in the task input)", file=sys.stderr)
+        return 1
 
     print("\n--- Lịch trình cho ngày hôm nay ---")
     schedule = scheduler.get_schedule_for_date(today)
@@ -41,9 +203,13 @@ def run_cli():
         print("Không có công việc nào được lên lịch.")
 
     print("\n--- Trạng thái cuối cùng của các task ---")
-    for task in scheduler.tasks:
+    for task in scheduler.iter_all_tasks():
         status = f"lúc {task.scheduled_start.strftime('%Y-%m-%d %H:%M')} - {task.scheduled_end.strftime('%H:%M')}" if task.scheduled_start else "Chưa lên lịch"
         print(f"- {task.description}: {status}")
 
+    if scheduler.stats is not None:
+        print("\n--- Profile ---", file=sys.stderr)
+        print(scheduler.stats.report(), file=sys.stderr)
+
 if __name__ == "__main__":
-    run_cli()
+    sys.exit(run_cli())
@@ -1,6 +1,7 @@
 import datetime
+import math
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 
 class Priority(Enum):
@@ -9,6 +10,132 @@ class Priority(Enum):
     HIGH = 3
     CRITICAL = 4
 
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+class RecurrenceRule:
+    """
+    Luật lặp lại đơn giản cho task: DAILY hoặc WEEKLY, có INTERVAL, weekday mask, UNTIL, COUNT.
+    Occurrences are computed arithmetically for a given day, so nothing is ever pre-expanded.
+    `weekdays` is a bit mask (bit 0 = Monday); None means the weekday of `start` for WEEKLY and
+    every day for DAILY (with a mask, DAILY only keeps the days in it, as BYDAY does in RRULE).
+    """
+    def __init__(self,
+                 freq: str,
+                 start: datetime.date,
+                 interval: int = 1,
+                 weekdays: Optional[int] = None,
+                 until: Optional[datetime.date] = None,
+                 count: Optional[int] = None):
+        freq = freq.upper()
+        if freq not in ("DAILY", "WEEKLY"):
+            raise ValueError(f"Unsupported recurrence frequency: {freq}")
+        if isinstance(start, datetime.datetime):
+            start = start.date()
+        if isinstance(until, datetime.datetime):
+            until = until.date()
+        self.freq = freq
+        self.start = start
+        self.interval = max(1, interval)
+        self.weekdays = weekdays
+        self.until = until
+        self.count = count
+
+    @classmethod
+    def from_string(cls, value: str, default_start: Optional[datetime.date] = None) -> "RecurrenceRule":
+        """
+        Parse dạng RRULE rút gọn, ví dụ "FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=10;DTSTART=2025-09-15".
+        A bare "DAILY"/"WEEKLY" is accepted as FREQ. DTSTART defaults to `default_start`, then today.
+        """
+        parts = {}
+        for item in value.replace(" ", "").split(";"):
+            if not item:
+                continue
+            if "=" in item:
+                key, val = item.split("=", 1)
+                parts[key.upper()] = val
+            else:
+                parts["FREQ"] = item
+        if "DTSTART" in parts:
+            start = datetime.date.fromisoformat(parts["DTSTART"])
+        else:
+            start = default_start or datetime.date.today()
+        weekdays = None
+        if parts.get("BYDAY"):
+            weekdays = 0
+            for code in parts["BYDAY"].split(","):
+                weekdays |= 1 << WEEKDAY_CODES.index(code.upper()[-2:])
+        return cls(
+            freq=parts.get("FREQ", "DAILY"),
+            start=start,
+            interval=int(parts.get("INTERVAL", 1)),
+            weekdays=weekdays,
+            until=datetime.date.fromisoformat(parts["UNTIL"]) if parts.get("UNTIL") else None,
+            count=int(parts["COUNT"]) if parts.get("COUNT") else None,
+        )
+
+    def occurrence_index(self, day: datetime.date) -> Optional[int]:
+        """
+        Trả về số thứ tự (0-based) của lần lặp rơi vào `day`, hoặc None nếu không lặp ngày đó.
+        """
+        if isinstance(day, datetime.datetime):
+            day = day.date()
+        if day < self.start or (self.until is not None and day > self.until):
+            return None
+        if self.freq == "DAILY":
+            delta = (day - self.start).days
+            if delta % self.interval:
+                return None
+            index = delta // self.interval
+            if self.weekdays:
+                if not self.weekdays & (1 << day.weekday()):
+                    return None
+                # Thứ trong tuần của các bước lặp lại theo chu kỳ `period` bước; chỉ đếm bước rơi vào mask
+                period = 7 // math.gcd(self.interval, 7)
+                kept = [self.weekdays >> ((self.start.weekday() + step * self.interval) % 7) & 1 for step in range(period)]
+                index = index // period * sum(kept) + sum(kept[:index % period])
+        else:
+            mask = self.weekdays if self.weekdays else 1 << self.start.weekday()
+            if not mask & (1 << day.weekday()):
+                return None
+            week_zero = self.start - datetime.timedelta(days=self.start.weekday())
+            week = (day - week_zero).days // 7
+            if week % self.interval:
+                return None
+            per_week = bin(mask).count("1")
+            # Các ngày trong mask của tuần đầu tiên nằm trước DTSTART không được tính
+            first_week = bin(mask >> self.start.weekday()).count("1")
+            before_day_mask = mask & ((1 << day.weekday()) - 1)
+            if week == 0:
+                index = bin(before_day_mask >> self.start.weekday()).count("1")
+            else:
+                index = first_week + (week // self.interval - 1) * per_week + bin(before_day_mask).count("1")
+        if self.count is not None and index >= self.count:
+            return None
+        return index
+
+    def to_string(self) -> str:
+        """
+        Dạng RRULE rút gọn mà from_string đọc lại được (luôn có DTSTART).
+        """
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.weekdays:
+            parts.append("BYDAY=" + ",".join(code for bit, code in enumerate(WEEKDAY_CODES) if self.weekdays & (1 << bit)))
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.isoformat()}")
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        parts.append(f"DTSTART={self.start.isoformat()}")
+        return ";".join(parts)
+
+    def occurs_on(self, day: datetime.date) -> bool:
+        return self.occurrence_index(day) is not None
+
+    def __repr__(self) -> str:
+        return (f"RecurrenceRule(freq={self.freq}, start={self.start}, interval={self.interval}, "
+                f"weekdays={self.weekdays}, until={self.until}, count={self.count})")
+
 class Task:
     def __init__(self,
                  id: int,
@@ -20,7 +147,9 @@ class Task:
                  energy_level: Optional[str] = None, # Ví dụ: "high", "medium", "low"
                  project_id: Optional[str] = None,
                  scheduled_start: Optional[datetime.datetime] = None,
-                 scheduled_end: Optional[datetime.datetime] = None): 
+                 scheduled_end: Optional[datetime.datetime] = None,
+                 recurrence: Optional[RecurrenceRule] = None,
+                 depends_on: Optional[List[int]] = None):
         self.id = id
         self.description = description
         self.duration_minutes = duration_minutes
@@ -31,6 +160,39 @@ class Task:
         self.project_id = project_id
         self.scheduled_start = scheduled_start
         self.scheduled_end = scheduled_end
+        self.recurrence = recurrence
+        # Id các task phải hoàn thành trước task này
+        self.depends_on: List[int] = list(depends_on) if depends_on else []
+        # Chỉ có ở các instance sinh ra từ task lặp lại
+        self.occurrence_date: Optional[datetime.date] = None
+
+    def occurrence_for(self, day: datetime.date) -> "Task":
+        """
+        Tạo instance của task lặp lại cho ngày `day`.
+        A template with scheduled_start/scheduled_end is a fixed commitment, so its times (and due
+        date) are shifted onto `day`; otherwise the instance is a pending task for that day.
+        """
+        if isinstance(day, datetime.datetime):
+            day = day.date()
+        shift = datetime.timedelta(days=(day - self.recurrence.start).days)
+        instance = Task(
+            id=self.id,
+            description=self.description,
+            duration_minutes=self.duration_minutes,
+            priority=self.priority,
+            due_date=self.due_date + shift if self.due_date else None,
+            preferred_time=self.preferred_time,
+            energy_level=self.energy_level,
+            project_id=self.project_id,
+            depends_on=self.depends_on,
+        )
+        if self.scheduled_start and self.scheduled_end:
+            day_start = datetime.datetime.combine(day, datetime.time())
+            offset = self.scheduled_start - self.scheduled_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            instance.scheduled_start = day_start + offset
+            instance.scheduled_end = instance.scheduled_start + (self.scheduled_end - self.scheduled_start)
+        instance.occurrence_date = day
+        return instance
 
     def __repr__(self) -> str:
         status = "Scheduled" if self.scheduled_start else "Pending"
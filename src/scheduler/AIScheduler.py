@@ -1,12 +1,30 @@
 import datetime
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional, Iterator
 from src.models import Task, TimeSlot
 from .CalendarManager import CalendarManager
 from .SlotScorer import SlotScorer
+from .RecurrenceExpander import RecurrenceExpander
+from .EventSink import EventSink, CountingSink, INFO, WARNING, PLACED, UNPLACEABLE, NO_SUITABLE_SLOT, BLOCKED, LATE
+from .DependencyGraph import DependencyGraph
+from .SchedulerStats import SchedulerStats
+from .DayProfile import SharedTables
+from .DecisionLog import DecisionLog, ACCEPTED, MOVED, factor_vector
+
+# Cách chọn vị trí: slot cố định của CalendarManager (mặc định) hoặc điểm bắt đầu tốt nhất trong khoảng trống
+SLOT_PLACEMENT = "slot"
+GAP_PLACEMENT = "gap"
+
+if TYPE_CHECKING:
+    # Chỉ dùng cho type hint; không import khi chạy để khởi động nhanh
+    from .ScheduleCache import ScheduleCache
+    from .ScheduleValidator import ValidationReport
+    from .CapacityIndex import CapacityIndex, CapacityReport
 
 
 class AIScheduler:
-    def __init__(self, settings: Optional[Dict] = None):
+    def __init__(self, settings: Optional[Dict] = None, event_sink: Optional[EventSink] = None,
+                 stats: Optional[SchedulerStats] = None, result_cache: Optional["ScheduleCache"] = None,
+                 shared_tables: Optional[SharedTables] = None, decision_log: Optional[DecisionLog] = None):
         if settings is None:
             settings = {
                 "work_start_hour": 9,
@@ -15,75 +33,396 @@ class AIScheduler:
                 "slot_duration_minutes": 30, # Thời gian quét để tìm slot trống
                 "group_by_project": True
             }
+        self.shared_tables = shared_tables
+        self.stats: Optional[SchedulerStats] = None
+        self.configure(settings)
+        self.tasks: List[Task] = []
+        self.scheduled_tasks: List[Task] = []
+        # Task lặp lại chỉ được sinh instance cho ngày đang lên lịch
+        self.recurrence = RecurrenceExpander(settings.get("recurrence_cache_days", 31))
+        # Sự kiện của vòng lặp lên lịch; mặc định chỉ đếm, không in gì
+        self.events = event_sink if event_sink is not None else CountingSink()
+        # Cache kết quả theo hash của input (tùy chọn, có thể dùng chung giữa nhiều scheduler)
+        self.result_cache = result_cache
+        # Log vector factor của các slot ứng viên để học trọng số offline (None = tắt)
+        self.decision_log = decision_log
+        if stats is not None:
+            self.enable_profiling(stats)
+
+    def configure(self, settings: Dict):
+        """
+        Dựng CalendarManager, múi giờ và SlotScorer theo `settings`.
+        Called again by update_settings; busy blocks already imported are kept as they are.
+        """
+        shared_tables = self.shared_tables
+        previous = getattr(self, "calendar_manager", None)
         self.settings = settings
         self.calendar_manager = CalendarManager(
             work_start_hour=settings.get("work_start_hour", 9),
             work_end_hour=settings.get("work_end_hour", 17),
-            buffer_minutes=settings.get("min_buffer_minutes", 15)
+            buffer_minutes=settings.get("min_buffer_minutes", 15),
+            slot_templates=shared_tables.slot_templates if shared_tables is not None else None
         )
+        if previous is not None:
+            self.calendar_manager.busy_index = previous.busy_index
+        # TimeZoneTable của user (giờ làm việc tính theo giờ local này); None = giờ naive như cũ
+        self.timezone = None
+        if settings.get("timezone"):
+            from .TimeZoneTable import TimeZoneTable
+            self.timezone = TimeZoneTable(settings["timezone"])
+            self.calendar_manager.timezone = self.timezone
         self.slot_scorer = SlotScorer(settings)
-        self.tasks: List[Task] = []
-        self.scheduled_tasks: List[Task] = []
+        if shared_tables is not None:
+            self.slot_scorer.day_profile = shared_tables.day_profile(settings)
+        if self.timezone is not None:
+            self.slot_scorer.clock = self.timezone.now
+        self.calendar_manager.stats = self.stats
+        self.slot_scorer.stats = self.stats
+
+    def update_settings(self, settings: Dict):
+        """
+        Đổi settings mà giữ nguyên task, instance lặp lại đã lên lịch, event sink, cache, decision log và profiling.
+        """
+        self.configure(settings)
+
+    def enable_profiling(self, stats: Optional[SchedulerStats] = None) -> SchedulerStats:
+        """
+        Bật đo thời gian/bộ đếm cho scheduler, CalendarManager và SlotScorer. Returns the stats object.
+        """
+        self.stats = stats if stats is not None else SchedulerStats()
+        self.calendar_manager.stats = self.stats
+        self.slot_scorer.stats = self.stats
+        return self.stats
+
+    def disable_profiling(self):
+        self.stats = None
+        self.calendar_manager.stats = None
+        self.slot_scorer.stats = None
+
+    def get_stats(self) -> Optional[Dict]:
+        return self.stats.as_dict() if self.stats is not None else None
 
     def add_task(self, task: Task):
-        self.tasks.append(task)
+        self.normalize_task_times(task)
+        if task.recurrence is not None:
+            self.recurrence.add(task)
+        else:
+            self.tasks.append(task)
+
+    def normalize_task_times(self, task: Task):
+        """
+        Đổi các datetime có tz của task về giờ local naive của user (hoặc giờ hệ thống nếu không đặt timezone).
+        Naive values are already local wall-clock time and are left as they are.
+        """
+        if any(value is not None and value.tzinfo is not None
+               for value in (task.due_date, task.scheduled_start, task.scheduled_end)):
+            from .TimeZoneTable import localize_task_times
+            localize_task_times(task, self.timezone)
+
+    def to_aware(self, value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+        """
+        Giờ local naive -> datetime có offset của user, để xuất ra ngoài. Unchanged without a timezone.
+        """
+        return self.timezone.attach(value) if self.timezone is not None else value
+
+    def now(self) -> datetime.datetime:
+        """
+        Giờ hiện tại theo giờ local naive của user (giờ máy nếu không đặt timezone), như SlotScorer dùng.
+        """
+        return self.slot_scorer.clock()
+
+    def remove_task(self, task_id: int) -> bool:
+        """
+        Xóa task (hoặc task lặp lại) theo id. Returns True if anything was removed.
+        """
+        before = len(self.tasks) + len(self.recurrence)
+        self.tasks = [task for task in self.tasks if task.id != task_id]
+        self.scheduled_tasks = [task for task in self.scheduled_tasks if task.id != task_id]
+        self.recurrence.remove(task_id)
+        return len(self.tasks) + len(self.recurrence) < before
+
+    def iter_all_tasks(self) -> Iterator[Task]:
+        """
+        Yield mọi task thường, sau đó là các instance lặp lại đã sinh (kể cả đã lên lịch rồi bị đẩy khỏi cache).
+        """
+        yield from self.tasks
+        yield from self.recurrence.iter_all()
+
+    def validate_fixed_tasks(self, merge_conflicts: bool = False) -> "ValidationReport":
+        """
+        Kiểm tra các task cố định (chồng lấn, ngoài giờ làm, end <= start) trong một lượt sweep.
+        With merge_conflicts=True each overlapping cluster is also added to the busy index, so
+        occupancy checks see the full merged span regardless of how the rows overlap.
+        """
+        from .ScheduleValidator import ScheduleValidator
+        validator = ScheduleValidator(self.settings.get("work_start_hour", 9), self.settings.get("work_end_hour", 17))
+        report = validator.validate(self.tasks)
+        if merge_conflicts and report.conflicts:
+            self.calendar_manager.add_busy_blocks(report.busy_blocks())
+        return report
+
+    def capacity_index(self, start_date: Optional[datetime.datetime] = None, days: int = 1) -> "CapacityIndex":
+        """
+        Prefix sum số phút trống (giờ làm việc trừ lịch bận và task đã có giờ) cho `days` ngày từ `start_date`.
+        """
+        from .CapacityIndex import CapacityIndex
+        start = start_date if start_date is not None else self.current_date
+        fixed = [task for task in self.tasks if task.scheduled_start]
+        if len(self.recurrence):
+            fixed.extend(self.recurrence.iter_cached(start, start + datetime.timedelta(days=max(1, days))))
+        return CapacityIndex.from_calendar(self.calendar_manager, start, days, fixed)
+
+    def check_capacity(self, start_date: Optional[datetime.datetime] = None, days: int = 1) -> "CapacityReport":
+        """
+        Trước khi chấm điểm: số phút trống theo ngày và các deadline mà nhu cầu của task pending vượt quá.
+        Recurring instances of the horizon are expanded so their demand is counted too.
+        """
+        start = (start_date if start_date is not None else self.current_date).replace(hour=0, minute=0, second=0, microsecond=0)
+        pending = [task for task in self.tasks if task.scheduled_start is None]
+        if len(self.recurrence):
+            for offset in range(max(1, days)):
+                pending.extend(instance for instance in self.recurrence.instances_for(start + datetime.timedelta(days=offset))
+                               if instance.scheduled_start is None)
+        return self.capacity_index(start, days).check_demand(pending)
 
     def schedule_tasks(self, target_date: Optional[datetime.datetime] = None):
         if target_date is None:
             target_date = self.current_date.replace(hour=0, minute=0, second=0, microsecond=0)
         else:
+            if target_date.tzinfo is not None:
+                from .TimeZoneTable import to_local_naive
+                target_date = to_local_naive(target_date, self.timezone)
             self.current_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.timezone is not None:
+            # Giờ local không tồn tại (chuyển giờ mùa hè) được coi là bận
+            day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            self.calendar_manager.add_busy_blocks(self.timezone.iter_gaps(day, day + datetime.timedelta(days=1)))
+        if self.result_cache is not None and self.can_use_result_cache():
+            self.result_cache.schedule(self, target_date)
+        else:
+            self.run_schedule_pass(target_date)
+
+    def can_use_result_cache(self) -> bool:
+        """
+        Một cache hit không chấm điểm lại, nên không có offer cho decision log, số đo profiling hay event chi tiết.
+        The cache is therefore skipped while a decision log, profiling or a sink that records events
+        (anything beyond the default counting sink) is attached.
+        """
+        return self.decision_log is None and self.stats is None and type(self.events) in (EventSink, CountingSink)
+
+    def run_schedule_pass(self, target_date: datetime.datetime):
+        stats = self.stats
+        if stats is not None:
+            run_started = stats.now()
 
         # 1. Chuẩn bị dữ liệu cho ngày cần lên lịch
         # Lấy các task chưa được lên lịch
         pending_tasks = [task for task in self.tasks if task.scheduled_start is None]
         # Lấy các task đã lên lịch trong ngày hôm nay (nếu có)
         tasks_already_scheduled_today = [task for task in self.tasks if task.scheduled_start and task.scheduled_start.date() == target_date.date()]
+        # Instance của các task lặp lại trong ngày này (sinh lazily, có cache)
+        if len(self.recurrence):
+            for instance in self.recurrence.instances_for(target_date):
+                if instance.scheduled_start is None:
+                    pending_tasks.append(instance)
+                elif instance.scheduled_start.date() == target_date.date():
+                    tasks_already_scheduled_today.append(instance)
 
         # 2. Sắp xếp các task chờ xử lý theo độ ưu tiên và deadline
         pending_tasks.sort(key=lambda t: (-t.priority.value, t.due_date if t.due_date else datetime.datetime.max))
 
+        # 2b. Nếu có phụ thuộc: xếp theo DAG (giữ thứ tự ưu tiên giữa các task sẵn sàng)
+        # và lan truyền deadline ngược; DependencyCycleError nếu có chu trình
+        graph = None
+        if self.settings.get("respect_dependencies", any(task.depends_on for task in pending_tasks)):
+            graph = DependencyGraph(self.tasks + [task for task in pending_tasks if task.occurrence_date is not None])
+            latest_finish = graph.latest_finish()
+            pending_tasks = graph.topological_order(pending_tasks)
+
         # 3. Cập nhật thông tin dự án cho SlotScorer
         self.slot_scorer.update_scheduled_tasks_for_projects(tasks_already_scheduled_today)
 
+        if stats is not None:
+            stats.add_time("prepare", stats.now() - run_started)
+            stats.incr("tasks_considered", len(pending_tasks))
+
+        gap_placement = self.settings.get("placement", SLOT_PLACEMENT) == GAP_PLACEMENT
+
         # 4. Duyệt qua các task và tìm slot tốt nhất
         for task in pending_tasks:
             best_slot: Optional[TimeSlot] = None
             best_score: float = -1.0
+            earliest_start: Optional[datetime.datetime] = None
+
+            if graph is not None:
+                try:
+                    earliest_start = graph.earliest_start(task)
+                except LookupError as exc:
+                    if stats is not None:
+                        stats.incr("tasks_blocked")
+                    if self.events.enabled(WARNING):
+                        self.events.emit(BLOCKED, task, waiting_for=exc.args[0], date=target_date)
+                    continue
             
             # Lấy các slot trống trong ngày
             search_start = target_date
             search_end = target_date + datetime.timedelta(days=1)
-            available_slots = self.calendar_manager.get_available_slots(
-                search_start, search_end, tasks_already_scheduled_today
-            )
+            if stats is not None:
+                started = stats.now()
+            if gap_placement:
+                available_slots = self.calendar_manager.get_free_gaps(
+                    search_start, search_end, tasks_already_scheduled_today, task.duration_minutes
+                )
+            else:
+                available_slots = self.calendar_manager.get_available_slots(
+                    search_start, search_end, tasks_already_scheduled_today
+                )
+            if stats is not None:
+                stats.add_time("get_available_slots", stats.now() - started)
+                stats.incr("slots_available", len(available_slots))
+
+            latest = None
+            late_slots: List[TimeSlot] = []
+            if graph is not None:
+                latest = latest_finish.get(task.id)
+                if latest is not None and latest < target_date:
+                    latest = None # Deadline đã qua: giữ cách xử lý task quá hạn như cũ
+
+            if gap_placement:
+                # Các điểm bắt đầu ứng viên trong từng khoảng trống (đã tôn trọng ràng buộc phụ thuộc)
+                suitable_slots = self.gap_candidates(task, available_slots, earliest_start, latest)
+                if not suitable_slots and latest is not None:
+                    late_slots = self.gap_candidates(task, available_slots, earliest_start)
+            else:
+                # Lọc các slot đủ lớn cho task
+                suitable_slots = [slot for slot in available_slots if slot.duration_minutes >= task.duration_minutes]
 
-            # Lọc các slot đủ lớn cho task
-            suitable_slots = [slot for slot in available_slots if slot.duration_minutes >= task.duration_minutes]
+            # Loại trước khi chấm điểm các slot vi phạm ràng buộc phụ thuộc
+            if graph is not None and suitable_slots and not gap_placement:
+                if earliest_start is not None or latest is not None:
+                    duration = datetime.timedelta(minutes=task.duration_minutes)
+                    kept = [slot for slot in suitable_slots if earliest_start is None or slot.start >= earliest_start]
+                    late_slots = kept
+                    if latest is not None:
+                        kept = [slot for slot in kept if slot.start + duration <= latest]
+                    if stats is not None:
+                        stats.incr("slots_pruned", len(suitable_slots) - len(kept))
+                    suitable_slots = kept
+
+            if not suitable_slots and latest is not None and late_slots:
+                # Không slot nào kịp hạn: hôm nay vẫn sớm hơn mọi ngày sau, nên xếp trễ và ghi lại vi phạm
+                suitable_slots = late_slots
+                if stats is not None:
+                    stats.incr("latest_finish_violations")
+                if self.events.enabled(WARNING):
+                    self.events.emit(LATE, task, latest_finish=latest, date=target_date)
             
             if not suitable_slots:
-                print(f"Không tìm thấy đủ chỗ trống cho task: {task.description} (cần {task.duration_minutes} phút).")
+                if stats is not None:
+                    stats.incr("tasks_dropped")
+                if self.events.enabled(WARNING):
+                    self.events.emit(UNPLACEABLE, task, required_minutes=task.duration_minutes,
+                                     date=target_date, available_slots=len(available_slots))
                 continue
 
             # Tìm slot có điểm cao nhất
-            for slot in suitable_slots:
-                score = self.slot_scorer.score_slot(slot, task)
-                if score.total > best_score:
-                    best_score = score.total
-                    best_slot = slot
+            if stats is not None:
+                started = stats.now()
+            candidates = [] if self.decision_log is not None else None
+            # Scorer cũ (scheduler123) chỉ có score_slot
+            best_of = getattr(self.slot_scorer, "best_slot", None)
+            if candidates is None and best_of is not None:
+                best_slot, best_score = best_of(suitable_slots, task)
+            else:
+                for slot in suitable_slots:
+                    score = self.slot_scorer.score_slot(slot, task)
+                    if candidates is not None:
+                        candidates.append(factor_vector(score.factors))
+                    if score.total > best_score:
+                        best_score = score.total
+                        best_slot = slot
             
+            if stats is not None:
+                stats.add_time("scoring", stats.now() - started)
+                started = stats.now()
+
             # Lên lịch task vào slot tốt nhất nếu tìm thấy
             if best_slot:
                 task.scheduled_start = best_slot.start
                 task.scheduled_end = best_slot.start + datetime.timedelta(minutes=task.duration_minutes)
                 tasks_already_scheduled_today.append(task) # Thêm task vừa lên lịch vào danh sách hôm nay
-                self.scheduled_tasks.append(task)
-                print(f"Đã lên lịch: {task.description} vào lúc {task.scheduled_start.strftime('%H:%M')} - {task.scheduled_end.strftime('%H:%M')} (Score: {best_score:.2f})")
-            else:
-                print(f"Không tìm thấy slot phù hợp cho task: {task.description}")
+                if task.occurrence_date is None: # Instance lặp lại chỉ nằm trong cache theo ngày
+                    self.scheduled_tasks.append(task)
+                if candidates is not None:
+                    self.decision_log.record_offer(task, candidates, suitable_slots.index(best_slot), best_slot)
+                if self.events.enabled(INFO):
+                    self.events.emit(PLACED, task, start=task.scheduled_start, end=task.scheduled_end,
+                                     score=best_score, candidates=len(suitable_slots))
+            elif self.events.enabled(WARNING):
+                self.events.emit(NO_SUITABLE_SLOT, task, date=target_date, candidates=len(suitable_slots))
+            if stats is not None:
+                stats.add_time("placement", stats.now() - started)
+                stats.incr("tasks_placed" if best_slot else "tasks_dropped")
+
+        if stats is not None:
+            stats.add_time("schedule_tasks", stats.now() - run_started)
         
+    def gap_candidates(self, task: Task, gaps: List[TimeSlot], earliest_start: Optional[datetime.datetime] = None,
+                       latest_finish: Optional[datetime.datetime] = None) -> List[TimeSlot]:
+        """
+        Các vị trí ứng viên (dài đúng bằng task) trong các khoảng trống, theo thứ tự thời gian.
+        Instead of every minute, only the start times where the score can peak are tried (see
+        ScoringPlan.candidate_starts): each gap's first minute, whole hours and factor breakpoints.
+        """
+        duration = datetime.timedelta(minutes=task.duration_minutes)
+        candidates = []
+        for gap in gaps:
+            first = gap.start if earliest_start is None else max(gap.start, earliest_start)
+            last = gap.end - duration
+            if latest_finish is not None:
+                last = min(last, latest_finish - duration)
+            if first > last:
+                continue
+            for start in self.slot_scorer.candidate_starts(task, first, last, duration):
+                candidates.append(TimeSlot(start, start + duration))
+        return candidates
+
+    def record_feedback(self, task_id: int, moved_to: Optional[datetime.datetime] = None) -> bool:
+        """
+        Phản hồi của user cho một task đã xếp: chấp nhận (moved_to=None) hoặc dời sang `moved_to`.
+        A moved task is rescheduled in place; with a decision log the factor vector of the chosen
+        slot is logged so training sees which candidate the user actually preferred.
+        """
+        task = next((t for t in self.tasks if t.id == task_id and t.scheduled_start), None)
+        if task is None:
+            return False
+        if moved_to is None:
+            if self.decision_log is not None:
+                self.decision_log.record_feedback(task, ACCEPTED)
+            return True
+        slot = TimeSlot(moved_to, moved_to + datetime.timedelta(minutes=task.duration_minutes))
+        if self.decision_log is not None:
+            self.slot_scorer.update_scheduled_tasks_for_projects(
+                [t for t in self.get_schedule_for_date(moved_to) if t is not task])
+            self.decision_log.record_feedback(task, MOVED, self.slot_scorer.score_slot(slot, task).factors)
+        task.scheduled_start = slot.start
+        task.scheduled_end = slot.end
+        return True
+
     def get_schedule_for_date(self, date: datetime.datetime) -> List[Task]:
-        return sorted(
-            [task for task in self.tasks if task.scheduled_start and task.scheduled_start.date() == date.date()],
-            key=lambda t: t.scheduled_start
-        )
+        tasks = [task for task in self.tasks if task.scheduled_start and task.scheduled_start.date() == date.date()]
+        if len(self.recurrence):
+            tasks.extend(task for task in self.recurrence.instances_for(date) if task.scheduled_start)
+        return sorted(tasks, key=lambda t: t.scheduled_start)
+
+    def iter_scheduled_between(self, start: datetime.datetime, end: datetime.datetime) -> Iterator[Task]:
+        """
+        Lazily yield tasks whose scheduled_start falls in [start, end), in task order.
+        Dùng cho các exporter dạng stream (ví dụ .ics) mà không tạo thêm list.
+        """
+        for task in self.tasks:
+            if task.scheduled_start and task.scheduled_end and start <= task.scheduled_start < end:
+                yield task
+        for task in self.recurrence.iter_cached(start, end):
+            if task.scheduled_start and task.scheduled_end and start <= task.scheduled_start < end:
+                yield task
@@ -0,0 +1,62 @@
+import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.models import Task
+from .AIScheduler import AIScheduler
+from .DayProfile import SharedTables
+
+
+class UserResult:
+    def __init__(self, user_id, scheduled: List[Task], unscheduled: List[Task], scheduler: Optional[AIScheduler] = None):
+        self.user_id = user_id
+        self.scheduled = scheduled
+        self.unscheduled = unscheduled
+        self.scheduler = scheduler
+
+    def __repr__(self) -> str:
+        return f"UserResult(user={self.user_id}, scheduled={len(self.scheduled)}, unscheduled={len(self.unscheduled)})"
+
+
+class BatchScheduler:
+    """
+    Lên lịch cho nhiều user trong một lần gọi.
+    Users with identical settings share one DayProfile and the same cached slot templates, so
+    per-user cost is only the user's own tasks. Schedulers are dropped after each user unless
+    `keep_schedulers=True`, keeping memory proportional to one user at a time.
+    """
+    def __init__(self, shared_tables: Optional[SharedTables] = None, keep_schedulers: bool = False):
+        self.shared_tables = shared_tables if shared_tables is not None else SharedTables()
+        self.keep_schedulers = keep_schedulers
+
+    def schedule_user(self, user_id, settings: Optional[Dict], tasks: Iterable[Task],
+                      target_date: datetime.datetime, days: int = 1) -> UserResult:
+        scheduler = AIScheduler(settings=settings, shared_tables=self.shared_tables)
+        for task in tasks:
+            scheduler.add_task(task)
+        target_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(max(1, days)):
+            scheduler.schedule_tasks(target_date=target_date + datetime.timedelta(days=offset))
+        scheduled = []
+        unscheduled = []
+        for task in scheduler.iter_all_tasks():
+            (scheduled if task.scheduled_start else unscheduled).append(task)
+        return UserResult(user_id, scheduled, unscheduled, scheduler if self.keep_schedulers else None)
+
+    def iter_schedule_users(self, users: Iterable[Tuple[object, Optional[Dict], Iterable[Task]]],
+                            target_date: datetime.datetime, days: int = 1) -> Iterator[UserResult]:
+        """
+        Stream kết quả từng user; `users` là iterable (user_id, settings, tasks).
+        """
+        for user_id, settings, tasks in users:
+            yield self.schedule_user(user_id, settings, tasks, target_date, days)
+
+    def schedule_users(self, users: Dict[object, Dict], target_date: datetime.datetime,
+                       days: int = 1) -> Dict[object, UserResult]:
+        """
+        `users` = {user_id: {"settings": {...}, "tasks": [Task, ...]}}. Returns {user_id: UserResult}.
+        """
+        return {
+            result.user_id: result
+            for result in self.iter_schedule_users(
+                ((user_id, data.get("settings"), data.get("tasks", [])) for user_id, data in users.items()),
+                target_date, days)
+        }
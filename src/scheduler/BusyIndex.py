@@ -0,0 +1,87 @@
+import datetime
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, Tuple
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_MINUTE = datetime.timedelta(minutes=1)
+
+
+def to_minutes(value: datetime.datetime) -> int:
+    return (value - EPOCH) // ONE_MINUTE
+
+def from_minutes(value: int) -> datetime.datetime:
+    return EPOCH + datetime.timedelta(minutes=value)
+
+
+class BusyIndex:
+    """
+    Danh sách các khoảng bận đã sắp xếp, không chồng lấn, lưu dưới dạng phút (int).
+    Two parallel `array('q')` columns keep each block at 16 bytes instead of a full Task object;
+    overlapping or touching blocks are merged on insert so lookups are a single bisect.
+    """
+    def __init__(self):
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, start: datetime.datetime, end: datetime.datetime):
+        self.add_minutes(to_minutes(start), to_minutes(end))
+
+    def add_minutes(self, start: int, end: int):
+        if end <= start:
+            return
+        # Các block chạm hoặc chồng lên [start, end] nằm trong khoảng [lo, hi)
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = array('q', [start])
+        self.ends[lo:hi] = array('q', [end])
+
+    def add_many(self, blocks: Iterable[Tuple[datetime.datetime, datetime.datetime]]):
+        """
+        Bulk insert: sort once and merge in a single pass instead of one bisect-splice per block.
+        """
+        pending = sorted(
+            (to_minutes(start), to_minutes(end)) for start, end in blocks if end > start
+        )
+        if not pending:
+            return
+        pending.extend(zip(self.starts, self.ends))
+        pending.sort()
+        starts = array('q')
+        ends = array('q')
+        for start, end in pending:
+            if ends and start <= ends[-1]:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+
+    def clear(self):
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def overlaps(self, start: datetime.datetime, end: datetime.datetime) -> bool:
+        return self.overlaps_minutes(to_minutes(start), to_minutes(end))
+
+    def overlaps_minutes(self, start: int, end: int) -> bool:
+        idx = bisect_right(self.ends, start)
+        return idx < len(self.starts) and self.starts[idx] < end
+
+    def iter_minutes(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        idx = bisect_right(self.ends, start)
+        while idx < len(self.starts) and self.starts[idx] < end:
+            yield self.starts[idx], self.ends[idx]
+            idx += 1
+
+    def iter_between(self, start: datetime.datetime, end: datetime.datetime) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+        for block_start, block_end in self.iter_minutes(to_minutes(start), to_minutes(end)):
+            yield from_minutes(block_start), from_minutes(block_end)
@@ -1,14 +1,40 @@
 import datetime
-from typing import List
+import heapq
+from typing import Iterable, List, Optional, Tuple
 from src.models import Task, TimeSlot
+from .BusyIndex import BusyIndex, to_minutes, from_minutes
+from .DayProfile import SlotTemplateCache
 
 
 class CalendarManager:
-    def __init__(self, work_start_hour: int = 9, work_end_hour: int = 17, buffer_minutes: int = 15):
+    def __init__(self, work_start_hour: int = 9, work_end_hour: int = 17, buffer_minutes: int = 15,
+                 slot_templates: Optional[SlotTemplateCache] = None):
         self.work_start_hour = work_start_hour
         self.work_end_hour = work_end_hour
         self.buffer_minutes = buffer_minutes
         self.current_date = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Các khoảng bận cố định (ví dụ import từ .ics), không phải Task
+        self.busy_index = BusyIndex()
+        # SchedulerStats khi bật profiling, None khi tắt
+        self.stats = None
+        # Slot ứng viên theo ngày; truyền vào một cache dùng chung để chia sẻ giữa nhiều user
+        self.slot_templates = slot_templates if slot_templates is not None else SlotTemplateCache(max_entries=64)
+        # TimeZoneTable của user khi có đặt timezone; khoảng bận có tz được đổi về giờ local theo bảng này
+        self.timezone = None
+
+    def add_busy_block(self, start: datetime.datetime, end: datetime.datetime):
+        if start.tzinfo is not None or end.tzinfo is not None:
+            start, end = self.localize_block(start, end)
+        self.busy_index.add(start, end)
+
+    def add_busy_blocks(self, blocks: Iterable[Tuple[datetime.datetime, datetime.datetime]]):
+        self.busy_index.add_many(
+            self.localize_block(start, end) if start.tzinfo is not None or end.tzinfo is not None else (start, end)
+            for start, end in blocks)
+
+    def localize_block(self, start: datetime.datetime, end: datetime.datetime) -> Tuple[datetime.datetime, datetime.datetime]:
+        from .TimeZoneTable import to_local_naive
+        return to_local_naive(start, self.timezone), to_local_naive(end, self.timezone)
 
     def get_available_slots(self, start_time: datetime.datetime, end_time: datetime.datetime,
                             tasks_scheduled_today: List[Task]) -> List[TimeSlot]:
@@ -16,24 +42,81 @@ class CalendarManager:
         Tìm các khoảng thời gian trống trong một khoảng thời gian cho trước,
         loại trừ các khoảng đã có task.
         """
-        all_slots = self.generate_potential_slots(start_time, end_time)
+        candidate_slots = self.get_candidate_slots(start_time, end_time)
         available_slots = []
-        
+
         # Sắp xếp các task đã lên lịch theo thời gian bắt đầu để dễ xử lý
         tasks_scheduled_today.sort(key=lambda t: t.scheduled_start)
 
-        current_cursor = start_time
-        task_idx = 0
+        for adjusted_slot in candidate_slots:
+            # Kiểm tra xem slot này có bị chiếm dụng không
+            is_occupied = self.busy_index.overlaps(adjusted_slot.start, adjusted_slot.end)
+            if not is_occupied:
+                for t in tasks_scheduled_today:
+                    if t.scheduled_start and t.scheduled_end:
+                        if max(adjusted_slot.start, t.scheduled_start) < min(adjusted_slot.end, t.scheduled_end):
+                            is_occupied = True
+                            break
+
+            if not is_occupied:
+                available_slots.append(adjusted_slot)
 
+        return available_slots
+
+    def get_free_gaps(self, start_time: datetime.datetime, end_time: datetime.datetime,
+                      tasks_scheduled_today: List[Task], min_minutes: int = 1) -> List[TimeSlot]:
+        """
+        Các khoảng trống liên tục (tối đa) trong giờ làm việc của [start_time, end_time), theo thứ tự thời gian.
+        Busy blocks and scheduled tasks are merged in one sweep; gaps shorter than `min_minutes`
+        are skipped. Unlike get_available_slots the gaps are not cut into fixed-length slots.
+        """
+        range_start, range_end = to_minutes(start_time), to_minutes(end_time)
+        scheduled = sorted((to_minutes(t.scheduled_start), to_minutes(t.scheduled_end))
+                           for t in tasks_scheduled_today if t.scheduled_start and t.scheduled_end)
+        merged = heapq.merge(self.busy_index.iter_minutes(range_start, range_end), scheduled)
+        busy_start, busy_end = next(merged, (range_end, range_end))
+        gaps = []
+        day = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end_time:
+            window_start = max(range_start, to_minutes(day) + self.work_start_hour * 60)
+            window_end = min(range_end, to_minutes(day) + self.work_end_hour * 60)
+            cursor = window_start
+            while cursor < window_end:
+                # Bỏ qua các khoảng bận đã kết thúc trước cursor
+                while busy_end <= cursor:
+                    busy_start, busy_end = next(merged, (range_end, range_end))
+                if busy_start > cursor:
+                    gap_end = min(busy_start, window_end)
+                    if gap_end - cursor >= min_minutes:
+                        gaps.append(TimeSlot(from_minutes(cursor), from_minutes(gap_end)))
+                    cursor = gap_end
+                else:
+                    cursor = busy_end
+            day += datetime.timedelta(days=1)
+        return gaps
+
+    def get_candidate_slots(self, start_time: datetime.datetime, end_time: datetime.datetime) -> Tuple[TimeSlot, ...]:
+        """
+        Các slot nằm trong giờ làm việc (đã cắt theo giờ làm việc, đủ dài hơn buffer), chưa xét task bận.
+        The result only depends on the time range and work-hour settings, so it is cached in
+        `slot_templates` (possibly shared with other CalendarManagers) and must not be mutated.
+        """
+        key = (start_time, end_time, self.work_start_hour, self.work_end_hour, self.buffer_minutes)
+        if self.slot_templates is not None:
+            cached = self.slot_templates.get(key)
+            if cached is not None:
+                return cached
+
+        if self.stats is not None:
+            started = self.stats.now()
+            all_slots = self.generate_potential_slots(start_time, end_time)
+            self.stats.add_time("generate_potential_slots", self.stats.now() - started)
+            self.stats.incr("slots_generated", len(all_slots))
+        else:
+            all_slots = self.generate_potential_slots(start_time, end_time)
+
+        candidate_slots = []
         for slot in all_slots:
-            # Bỏ qua các slot đã bị chiếm dụng bởi task đã lên lịch
-            while task_idx < len(tasks_scheduled_today) and \
-                  tasks_scheduled_today[task_idx].scheduled_start and \
-                  tasks_scheduled_today[task_idx].scheduled_end and \
-                  tasks_scheduled_today[task_idx].scheduled_start < slot.end and \
-                  tasks_scheduled_today[task_idx].scheduled_end > slot.start:
-                task_idx += 1
-            
             # Kiểm tra xem slot có hoàn toàn nằm trong khoảng thời gian làm việc không
             slot_start_in_work_hours = self.work_start_hour <= slot.start.hour < self.work_end_hour
             slot_end_in_work_hours = self.work_start_hour <= slot.end.hour < self.work_end_hour
@@ -46,19 +129,12 @@ class CalendarManager:
 
                 if actual_start < actual_end: # Đảm bảo có khoảng thời gian hợp lệ
                     adjusted_slot = TimeSlot(actual_start, actual_end)
-                    
-                    # Kiểm tra lại xem slot này có còn bị chiếm dụng không sau khi điều chỉnh
-                    is_occupied = False
-                    for t in tasks_scheduled_today:
-                        if t.scheduled_start and t.scheduled_end:
-                            if max(adjusted_slot.start, t.scheduled_start) < min(adjusted_slot.end, t.scheduled_end):
-                                is_occupied = True
-                                break
-                    
-                    if not is_occupied and adjusted_slot.duration_minutes >= self.buffer_minutes:
-                         available_slots.append(adjusted_slot)
-        
-        return available_slots
+                    if adjusted_slot.duration_minutes >= self.buffer_minutes:
+                        candidate_slots.append(adjusted_slot)
+
+        if self.slot_templates is not None:
+            return self.slot_templates.put(key, candidate_slots)
+        return tuple(candidate_slots)
 
     def generate_potential_slots(self, start_time: datetime.datetime, end_time: datetime.datetime, slot_duration_minutes: int = 60) -> List[TimeSlot]:
         """
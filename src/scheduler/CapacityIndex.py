@@ -0,0 +1,270 @@
+import datetime
+import heapq
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src.models import Task
+from .BusyIndex import to_minutes
+
+MINUTES_PER_HOUR = 60
+HOURS_PER_DAY = 24
+# Số dòng tối đa cho mỗi loại trong report(); as_dict() luôn đầy đủ
+REPORT_LIMIT = 10
+
+
+class DeadlineLoad:
+    """
+    Nhu cầu tích lũy (phút) của mọi task pending có deadline <= `deadline`, so với số phút trống trước đó.
+    """
+    def __init__(self, deadline: datetime.datetime, demand: int, capacity: int, tasks: List[Task]):
+        self.deadline = deadline
+        self.demand = demand
+        self.capacity = capacity
+        self.tasks = tasks
+
+    @property
+    def shortfall(self) -> int:
+        return max(0, self.demand - self.capacity)
+
+    def __repr__(self) -> str:
+        return f"DeadlineLoad(deadline='{self.deadline.isoformat()}', demand={self.demand}, capacity={self.capacity})"
+
+
+class CapacityReport:
+    def __init__(self, start: datetime.datetime, end: datetime.datetime):
+        self.start = start
+        self.end = end
+        self.pending = 0
+        self.demand = 0
+        self.capacity = 0
+        self.overloaded: List[DeadlineLoad] = []
+        # Task mà riêng nó đã dài hơn số phút trống trước deadline của nó
+        self.infeasible: List[Tuple[Task, int]] = []
+        self.overdue: List[Task] = []
+        # (ngày, phút trống, phút cần xong trong ngày, thiếu hụt tích lũy đến hết ngày)
+        self.days: List[Tuple[datetime.date, int, int, int]] = []
+
+    @property
+    def ok(self) -> bool:
+        return not (self.overloaded or self.infeasible or self.demand > self.capacity)
+
+    @property
+    def overbooked_days(self) -> List[datetime.date]:
+        return [day for day, _, _, shortfall in self.days if shortfall > 0]
+
+    def as_dict(self) -> Dict:
+        return {
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "pending": self.pending,
+            "demand_minutes": self.demand,
+            "free_minutes": self.capacity,
+            "overloaded": [{"deadline": load.deadline.isoformat(), "demand": load.demand, "capacity": load.capacity,
+                            "shortfall": load.shortfall, "tasks": [task.id for task in load.tasks]}
+                           for load in self.overloaded],
+            "infeasible": [{"task": task.id, "duration": task.duration_minutes, "capacity": capacity}
+                           for task, capacity in self.infeasible],
+            "overdue": [task.id for task in self.overdue],
+            "days": [{"date": day.isoformat(), "free": free, "due": due, "shortfall": shortfall}
+                     for day, free, due, shortfall in self.days],
+        }
+
+    def report(self) -> str:
+        lines = [f"capacity {self.start.strftime('%Y-%m-%d')} - {self.end.strftime('%Y-%m-%d')}: "
+                 f"{self.pending} pending tasks need {self.demand} min, {self.capacity} min free, "
+                 f"{len(self.overloaded)} overloaded deadlines, {len(self.infeasible)} infeasible, {len(self.overdue)} overdue"]
+        for day, free, due, shortfall in self.days:
+            mark = f"  OVERBOOKED by {shortfall} min" if shortfall > 0 else ""
+            lines.append(f"  {day.isoformat()}: free {free:>5} min, due {due:>5} min{mark}")
+        for load in self.overloaded[:REPORT_LIMIT]:
+            ids = ", ".join(str(task.id) for task in load.tasks)
+            lines.append(f"  overloaded by {load.deadline.strftime('%Y-%m-%d %H:%M')}: need {load.demand} min, "
+                         f"{load.capacity} free (short {load.shortfall}); due then: {ids}")
+        if len(self.overloaded) > REPORT_LIMIT:
+            lines.append(f"  ... {len(self.overloaded) - REPORT_LIMIT} more overloaded deadlines")
+        for task, capacity in self.infeasible[:REPORT_LIMIT]:
+            lines.append(f"  infeasible: task {task.id} needs {task.duration_minutes} min, {capacity} free before its deadline")
+        if len(self.infeasible) > REPORT_LIMIT:
+            lines.append(f"  ... {len(self.infeasible) - REPORT_LIMIT} more infeasible tasks")
+        return "\n".join(lines)
+
+
+class CapacityIndex:
+    """
+    Số phút trống trong giờ làm việc trên một horizon, dưới dạng prefix sum theo giờ và theo ngày.
+    Busy blocks (and fixed tasks) are merged once; after that the free minutes of any range whose
+    ends fall on whole hours are two array lookups, and other ranges add the two partial edge
+    hours from the merged blocks with a bisect.
+    """
+    def __init__(self, start_date: datetime.datetime, days: int = 1, work_start_hour: int = 9, work_end_hour: int = 17,
+                 busy: Iterable[Tuple[int, int]] = ()):
+        self.start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days = max(1, days)
+        self.work_start_hour = work_start_hour
+        self.work_end_hour = work_end_hour
+        self.origin = to_minutes(self.start)
+        self.horizon = self.days * HOURS_PER_DAY * MINUTES_PER_HOUR
+        # Các khoảng bận đã gộp, phút tương đối so với origin, cắt theo horizon
+        self.busy_starts = array('q')
+        self.busy_ends = array('q')
+        # hour_prefix[h] = số phút trống trong h giờ đầu của horizon; day_prefix[d] tương tự theo ngày
+        self.hour_prefix = array('q')
+        self.day_prefix = array('q')
+        self.build(busy)
+
+    @classmethod
+    def from_calendar(cls, calendar_manager, start_date: datetime.datetime, days: int = 1,
+                      fixed_tasks: Iterable[Task] = ()) -> "CapacityIndex":
+        """
+        Từ lịch bận của CalendarManager cộng với các task đã có giờ (`fixed_tasks`).
+        """
+        start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        range_start = to_minutes(start)
+        range_end = range_start + max(1, days) * HOURS_PER_DAY * MINUTES_PER_HOUR
+        fixed = sorted((to_minutes(task.scheduled_start), to_minutes(task.scheduled_end)) for task in fixed_tasks
+                       if task.scheduled_start and task.scheduled_end)
+        busy = heapq.merge(calendar_manager.busy_index.iter_minutes(range_start, range_end), fixed)
+        return cls(start, days, calendar_manager.work_start_hour, calendar_manager.work_end_hour, busy)
+
+    @property
+    def end(self) -> datetime.datetime:
+        return self.start + datetime.timedelta(days=self.days)
+
+    def build(self, busy: Iterable[Tuple[int, int]]):
+        """
+        `busy`: các khoảng (phút tuyệt đối) sắp xếp theo điểm bắt đầu, có thể chồng nhau.
+        """
+        origin, horizon = self.origin, self.horizon
+        starts, ends = array('q'), array('q')
+        for block_start, block_end in busy:
+            block_start, block_end = max(0, block_start - origin), min(horizon, block_end - origin)
+            if block_start >= block_end:
+                continue
+            if ends and block_start <= ends[-1]:
+                if block_end > ends[-1]:
+                    ends[-1] = block_end
+            else:
+                starts.append(block_start)
+                ends.append(block_end)
+        self.busy_starts, self.busy_ends = starts, ends
+
+        hours = self.days * HOURS_PER_DAY
+        work_hour = [self.work_start_hour <= hour < self.work_end_hour for hour in range(HOURS_PER_DAY)]
+        free = [MINUTES_PER_HOUR if work_hour[hour % HOURS_PER_DAY] else 0 for hour in range(hours)]
+        # Trừ phần bận rơi vào giờ làm việc, theo từng giờ mà khoảng bận phủ lên
+        for block_start, block_end in zip(starts, ends):
+            for hour in range(block_start // MINUTES_PER_HOUR, (block_end - 1) // MINUTES_PER_HOUR + 1):
+                if work_hour[hour % HOURS_PER_DAY]:
+                    hour_start = hour * MINUTES_PER_HOUR
+                    free[hour] -= min(block_end, hour_start + MINUTES_PER_HOUR) - max(block_start, hour_start)
+
+        hour_prefix = array('q', [0])
+        total = 0
+        for minutes in free:
+            total += minutes
+            hour_prefix.append(total)
+        self.hour_prefix = hour_prefix
+        self.day_prefix = array('q', hour_prefix[::HOURS_PER_DAY])
+
+    def busy_within(self, start: int, end: int) -> int:
+        # Số phút bận trong [start, end) (phút tương đối); chỉ dùng cho phần lẻ trong một giờ
+        busy = 0
+        idx = bisect_right(self.busy_ends, start)
+        while idx < len(self.busy_starts) and self.busy_starts[idx] < end:
+            busy += min(end, self.busy_ends[idx]) - max(start, self.busy_starts[idx])
+            idx += 1
+        return busy
+
+    def free_in_part(self, start: int, end: int) -> int:
+        # Phút trống trong [start, end) nằm trọn trong một giờ
+        if start >= end or not self.work_start_hour <= (start // MINUTES_PER_HOUR) % HOURS_PER_DAY < self.work_end_hour:
+            return 0
+        return end - start - self.busy_within(start, end)
+
+    def free_minutes(self, start: datetime.datetime, end: datetime.datetime) -> int:
+        """
+        Số phút trống trong giờ làm việc của [start, end), cắt theo horizon.
+        """
+        first = min(max(0, to_minutes(start) - self.origin), self.horizon)
+        last = min(max(0, to_minutes(end) - self.origin), self.horizon)
+        if first >= last:
+            return 0
+        first_hour = -(-first // MINUTES_PER_HOUR)
+        last_hour = last // MINUTES_PER_HOUR
+        if first_hour > last_hour:
+            return self.free_in_part(first, last)
+        return (self.hour_prefix[last_hour] - self.hour_prefix[first_hour]
+                + self.free_in_part(first, first_hour * MINUTES_PER_HOUR)
+                + self.free_in_part(last_hour * MINUTES_PER_HOUR, last))
+
+    def free_on_day(self, day: datetime.date) -> int:
+        index = (day - self.start.date()).days
+        if not 0 <= index < self.days:
+            return 0
+        return self.day_prefix[index + 1] - self.day_prefix[index]
+
+    def free_in_hour(self, hour: datetime.datetime) -> int:
+        index = (to_minutes(hour) - self.origin) // MINUTES_PER_HOUR
+        if not 0 <= index < self.days * HOURS_PER_DAY:
+            return 0
+        return self.hour_prefix[index + 1] - self.hour_prefix[index]
+
+    def utilisation(self, day: datetime.date) -> float:
+        work_minutes = max(0, self.work_end_hour - self.work_start_hour) * MINUTES_PER_HOUR
+        return 1.0 - self.free_on_day(day) / work_minutes if work_minutes else 0.0
+
+    def iter_days(self) -> Iterator[Tuple[datetime.date, int]]:
+        for index in range(self.days):
+            yield (self.start + datetime.timedelta(days=index)).date(), self.day_prefix[index + 1] - self.day_prefix[index]
+
+    def check_demand(self, tasks: Iterable[Task]) -> CapacityReport:
+        """
+        So nhu cầu của các task pending với số phút trống, theo deadline, trong một lượt sau khi sắp xếp.
+        A deadline is overloaded when the tasks due by then need more minutes than are free before
+        it. This is a necessary condition only: it ignores how the free minutes are fragmented.
+        Tasks without a due date (or due after the horizon) count against the whole horizon; overdue
+        tasks are listed separately and also count against the whole horizon.
+        """
+        report = CapacityReport(self.start, self.end)
+        report.capacity = self.hour_prefix[-1]
+        end = self.end
+        entries: List[Tuple[datetime.datetime, int, Task]] = []
+        for seq, task in enumerate(tasks):
+            if task.scheduled_start is not None:
+                continue
+            report.pending += 1
+            deadline = end
+            if task.due_date is not None:
+                if task.due_date <= self.start:
+                    report.overdue.append(task)
+                else:
+                    deadline = min(task.due_date, end)
+            entries.append((deadline, seq, task))
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+
+        due_per_day = [0] * self.days
+        demand = 0
+        index = 0
+        while index < len(entries):
+            deadline = entries[index][0]
+            capacity = self.free_minutes(self.start, deadline)
+            group: List[Task] = []
+            while index < len(entries) and entries[index][0] == deadline:
+                task = entries[index][2]
+                group.append(task)
+                demand += task.duration_minutes
+                if task.duration_minutes > capacity:
+                    report.infeasible.append((task, capacity))
+                index += 1
+            # Deadline 00:00 thuộc về ngày trước đó
+            day_index = min(self.days - 1, max(0, (to_minutes(deadline) - self.origin - 1) // (HOURS_PER_DAY * MINUTES_PER_HOUR)))
+            due_per_day[day_index] += sum(task.duration_minutes for task in group)
+            if demand > capacity:
+                report.overloaded.append(DeadlineLoad(deadline, demand, capacity, group))
+        report.demand = demand
+
+        cumulative_due = 0
+        for index, (day, free) in enumerate(self.iter_days()):
+            cumulative_due += due_per_day[index]
+            report.days.append((day, free, due_per_day[index], max(0, cumulative_due - self.day_prefix[index + 1])))
+        return report
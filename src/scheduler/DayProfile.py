@@ -0,0 +1,74 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from src.models import TimeSlot
+from .SlotScorer import SlotScorer
+
+
+def settings_key(settings: Dict) -> str:
+    return json.dumps(settings, sort_keys=True, default=str)
+
+
+class SlotTemplateCache:
+    """
+    Cache các slot ứng viên (đã cắt theo giờ làm việc, chưa lọc task bận) theo
+    (khoảng thời gian, giờ làm việc, buffer). The cached tuples are read-only and can be shared
+    by every CalendarManager with the same work-hour configuration.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple, Tuple[TimeSlot, ...]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Tuple[TimeSlot, ...]]:
+        slots = self.entries.get(key)
+        if slots is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return slots
+
+    def put(self, key: Tuple, slots: List[TimeSlot]) -> Tuple[TimeSlot, ...]:
+        slots = tuple(slots)
+        with self.lock:
+            self.entries[key] = slots
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return slots
+
+
+class DayProfile:
+    """
+    Bảng tra theo giờ (0-23) cho các factor chỉ phụ thuộc vào slot, tính một lần cho mỗi bộ settings.
+    `work_hour_alignment[h]` and `energy_level[h]` hold exactly what SlotScorer would compute for a
+    slot starting at hour h.
+    """
+    def __init__(self, settings: Dict):
+        scorer = SlotScorer(settings)
+        work_start = settings.get('work_start_hour', 9)
+        work_end = settings.get('work_end_hour', 17)
+        self.work_hour_alignment = tuple(1.0 if work_start <= hour < work_end else 0.0 for hour in range(24))
+        self.energy_level = tuple(scorer.get_energy_level_for_time(hour) for hour in range(24))
+
+
+class SharedTables:
+    """
+    Các bảng chỉ đọc dùng chung giữa nhiều user: slot template và DayProfile theo settings.
+    """
+    def __init__(self, max_templates: int = 1024):
+        self.slot_templates = SlotTemplateCache(max_templates)
+        self.day_profiles: Dict[str, DayProfile] = {}
+        self.lock = threading.Lock()
+
+    def day_profile(self, settings: Dict) -> DayProfile:
+        key = settings_key(settings)
+        profile = self.day_profiles.get(key)
+        if profile is None:
+            with self.lock:
+                profile = self.day_profiles.get(key)
+                if profile is None:
+                    profile = self.day_profiles[key] = DayProfile(settings)
+        return profile
@@ -0,0 +1,50 @@
+import json
+from typing import Dict, List, Optional, Sequence, TextIO
+from src.models import Task, TimeSlot
+from .SlotScorer import DEFAULT_WEIGHTS
+
+# Thứ tự cột của mọi vector factor trong log (trùng với thứ tự trong SlotScorer)
+FACTOR_NAMES = tuple(DEFAULT_WEIGHTS)
+
+OFFER = "offer"
+FEEDBACK = "feedback"
+ACCEPTED = "accepted"
+MOVED = "moved"
+
+
+def factor_vector(factors: Dict[str, float]) -> List[float]:
+    return [round(float(factors[name]), 6) for name in FACTOR_NAMES]
+
+
+class DecisionLog:
+    """
+    Log các quyết định xếp lịch để huấn luyện trọng số offline (src.training.fit_weights).
+    Each placement writes one "offer" line with the factor vector of every candidate slot and the
+    index that was offered; user reactions are "feedback" lines (accepted, or moved with the factor
+    vector of the slot the user picked instead). The first line is a header naming the columns.
+    """
+    def __init__(self, stream: TextIO, user: Optional[str] = None, close_stream: bool = False):
+        self.stream = stream
+        self.user = user
+        self.close_stream = close_stream
+        self.write({"type": "header", "factors": list(FACTOR_NAMES)})
+
+    def write(self, record: Dict):
+        self.stream.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self.stream.write("\n")
+
+    def record_offer(self, task: Task, candidates: Sequence[List[float]], offered: int, slot: TimeSlot):
+        self.write({"type": OFFER, "user": self.user, "task": task.id, "start": slot.start.isoformat(),
+                    "offered": offered, "candidates": list(candidates)})
+
+    def record_feedback(self, task: Task, outcome: str, factors: Optional[Dict[str, float]] = None):
+        record = {"type": FEEDBACK, "user": self.user, "task": task.id, "outcome": outcome}
+        if factors is not None:
+            record["factors"] = factor_vector(factors)
+        self.write(record)
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
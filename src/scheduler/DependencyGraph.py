@@ -0,0 +1,108 @@
+import datetime
+import heapq
+from typing import Dict, List, Optional
+from src.models import Task
+
+
+class DependencyCycleError(ValueError):
+    def __init__(self, cycle: List[int]):
+        super().__init__("Dependency cycle: " + " -> ".join(str(task_id) for task_id in cycle))
+        self.cycle = cycle
+
+
+class DependencyGraph:
+    """
+    DAG các task theo `depends_on` (id của task phải xong trước).
+    Ids that are not in the graph are treated as already satisfied.
+    """
+    def __init__(self, tasks: List[Task]):
+        self.tasks: Dict[int, Task] = {task.id: task for task in tasks}
+        self.successors: Dict[int, List[int]] = {task_id: [] for task_id in self.tasks}
+        self.predecessors: Dict[int, List[int]] = {task_id: [] for task_id in self.tasks}
+        for task in self.tasks.values():
+            for dep_id in task.depends_on:
+                if dep_id in self.tasks and dep_id not in self.predecessors[task.id]:
+                    self.predecessors[task.id].append(dep_id)
+                    self.successors[dep_id].append(task.id)
+
+    def find_cycle(self) -> Optional[List[int]]:
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = {task_id: WHITE for task_id in self.tasks}
+        for root in self.tasks:
+            if color[root] != WHITE:
+                continue
+            path = [root]
+            stack = [iter(self.successors[root])]
+            color[root] = GREY
+            while stack:
+                nxt = next(stack[-1], None)
+                if nxt is None:
+                    color[path.pop()] = BLACK
+                    stack.pop()
+                elif color[nxt] == GREY:
+                    return path[path.index(nxt):] + [nxt]
+                elif color[nxt] == WHITE:
+                    color[nxt] = GREY
+                    path.append(nxt)
+                    stack.append(iter(self.successors[nxt]))
+        return None
+
+    def topological_order(self, tasks: List[Task]) -> List[Task]:
+        """
+        Sắp xếp `tasks` theo thứ tự phụ thuộc; giữa các task sẵn sàng thì giữ thứ tự ban đầu
+        (priority/deadline). Raises DependencyCycleError if the graph has a cycle.
+        """
+        position = {id(task): index for index, task in enumerate(tasks)}
+        wanted = {task.id for task in tasks}
+        remaining = {task_id: sum(1 for dep in self.predecessors[task_id] if dep in wanted) for task_id in wanted}
+        by_id = {task.id: task for task in tasks}
+        ready = [(position[id(task)], task.id) for task in tasks if remaining[task.id] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, task_id = heapq.heappop(ready)
+            order.append(by_id[task_id])
+            for succ in self.successors[task_id]:
+                if succ in remaining:
+                    remaining[succ] -= 1
+                    if remaining[succ] == 0:
+                        heapq.heappush(ready, (position[id(by_id[succ])], succ))
+        if len(order) < len(tasks):
+            cycle = self.find_cycle()
+            raise DependencyCycleError(cycle or sorted(task_id for task_id, left in remaining.items() if left))
+        return order
+
+    def latest_finish(self) -> Dict[int, datetime.datetime]:
+        """
+        Lan truyền deadline ngược: LF(t) = min(due(t), min LF(s) - duration(s) với s phụ thuộc t).
+        Tasks without any deadline downstream are absent from the result.
+        """
+        order = self.topological_order(list(self.tasks.values()))
+        bounds: Dict[int, datetime.datetime] = {}
+        for task in reversed(order):
+            bound = task.due_date
+            for succ_id in self.successors[task.id]:
+                succ_bound = bounds.get(succ_id)
+                if succ_bound is not None:
+                    succ_task = self.tasks[succ_id]
+                    candidate = succ_bound - datetime.timedelta(minutes=succ_task.duration_minutes)
+                    if bound is None or candidate < bound:
+                        bound = candidate
+            if bound is not None:
+                bounds[task.id] = bound
+        return bounds
+
+    def earliest_start(self, task: Task) -> Optional[datetime.datetime]:
+        """
+        Thời điểm sớm nhất task được bắt đầu (max scheduled_end của các task phụ thuộc).
+        Returns None when there is no constraint; raises LookupError if a dependency is not scheduled yet.
+        """
+        earliest = None
+        for dep_id in self.predecessors.get(task.id, ()):
+            dep = self.tasks[dep_id]
+            dep_end = dep.scheduled_end or dep.scheduled_start
+            if dep_end is None:
+                raise LookupError(dep_id)
+            if earliest is None or dep_end > earliest:
+                earliest = dep_end
+        return earliest
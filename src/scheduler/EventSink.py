@@ -0,0 +1,106 @@
+import json
+import sys
+from typing import Dict, Optional, TextIO
+from src.models import Task
+
+# Cùng giá trị với các level của module logging (không import logging để CLI khởi động nhanh)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 60
+
+LEVEL_NAMES = {"debug": DEBUG, "info": INFO, "warning": WARNING, "off": OFF}
+
+# Tên các sự kiện phát ra từ vòng lặp lên lịch
+PLACED = "placed"
+UNPLACEABLE = "unplaceable"            # không có slot nào đủ dài cho task
+NO_SUITABLE_SLOT = "no_suitable_slot"  # có slot đủ dài nhưng không chọn được slot nào
+BLOCKED = "blocked_by_dependency"      # task phụ thuộc chưa được lên lịch
+LATE = "misses_latest_finish"          # không slot nào trong ngày kịp hạn lan truyền từ task phụ thuộc
+
+EVENT_LEVELS = {
+    PLACED: INFO,
+    UNPLACEABLE: WARNING,
+    NO_SUITABLE_SLOT: WARNING,
+    BLOCKED: WARNING,
+    LATE: WARNING,
+}
+
+
+class EventSink:
+    """
+    Sink mặc định: bỏ qua mọi sự kiện.
+    Callers check `enabled(level)` before building event fields, so a sink whose level is above
+    the event costs one integer comparison per event.
+    """
+    def __init__(self, level: int = OFF):
+        self.level = level
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    def emit(self, event: str, task: Task, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+class CountingSink(EventSink):
+    """
+    Chỉ đếm số sự kiện theo tên; không format hay I/O gì cả.
+    """
+    def __init__(self, level: int = DEBUG):
+        super().__init__(level)
+        self.counts: Dict[str, int] = {}
+
+    def emit(self, event: str, task: Task, **fields):
+        self.counts[event] = self.counts.get(event, 0) + 1
+
+
+class JsonLinesSink(EventSink):
+    """
+    Ghi mỗi sự kiện thành một dòng JSON vào `stream` (datetime được đổi sang ISO 8601).
+    """
+    def __init__(self, stream: TextIO, level: int = INFO, close_stream: bool = False):
+        super().__init__(level)
+        self.stream = stream
+        self.close_stream = close_stream
+
+    def emit(self, event: str, task: Task, **fields):
+        record = {"event": event, "task_id": task.id, "description": task.description}
+        for key, value in fields.items():
+            record[key] = value.isoformat() if hasattr(value, "isoformat") else value
+        self.stream.write(json.dumps(record, ensure_ascii=False))
+        self.stream.write("\n")
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+
+
+class ConsoleSink(EventSink):
+    """
+    In thông báo dễ đọc như CLI tương tác trước đây.
+    """
+    def __init__(self, stream: Optional[TextIO] = None, level: int = INFO):
+        super().__init__(level)
+        self.stream = stream
+
+    def emit(self, event: str, task: Task, **fields):
+        if event == PLACED:
+            message = (f"Đã lên lịch: {task.description} vào lúc {fields['start'].strftime('%H:%M')} - "
+                       f"{fields['end'].strftime('%H:%M')} (Score: {fields['score']:.2f})")
+        elif event == UNPLACEABLE:
+            message = f"Không tìm thấy đủ chỗ trống cho task: {task.description} (cần {task.duration_minutes} phút)."
+        elif event == NO_SUITABLE_SLOT:
+            message = f"Không tìm thấy slot phù hợp cho task: {task.description}"
+        elif event == BLOCKED:
+            message = f"Chưa thể lên lịch task: {task.description} (chờ task {fields['waiting_for']})"
+        elif event == LATE:
+            message = f"Không slot nào kịp hạn {fields['latest_finish'].strftime('%Y-%m-%d %H:%M')} cho task: {task.description}"
+        else:
+            message = f"{event}: {task.description}"
+        print(message, file=self.stream or sys.stdout)
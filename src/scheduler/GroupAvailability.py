@@ -0,0 +1,161 @@
+import datetime
+import heapq
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from src.models import Task, TimeSlot, Priority
+from .BusyIndex import to_minutes, from_minutes
+from .CalendarManager import CalendarManager
+from .SlotScorer import SlotScorer
+from .TimeZoneTable import MINUTES_PER_DAY, TimeZoneTable, to_local_naive
+
+
+class GroupAvailability:
+    """
+    Tìm khoảng trống chung cho nhiều người.
+    Each participant is a CalendarManager (busy index only) or an AIScheduler (busy index plus its
+    scheduled tasks). The sorted busy streams are k-way merged with heapq.merge, so a query costs
+    O(N log k) for N busy blocks across k participants. Gaps are clipped to the work hours all
+    participants share.
+
+    Times are naive wall-clock minutes of a reference zone (`timezone`, default the first
+    participant's zone). A participant whose calendar has another TimeZoneTable has its busy
+    blocks, and its hours outside work time, converted into the reference zone before merging;
+    participants without a timezone are taken to be in the reference zone.
+    """
+    def __init__(self, participants: Iterable, timezone: Union[str, TimeZoneTable, None] = None):
+        self.participants = list(participants)
+        if isinstance(timezone, str):
+            timezone = TimeZoneTable(timezone)
+        if timezone is None:
+            timezone = next((self.calendar_of(p).timezone for p in self.participants
+                             if self.calendar_of(p).timezone is not None), None)
+        self.timezone: Optional[TimeZoneTable] = timezone
+
+    @staticmethod
+    def calendar_of(participant) -> CalendarManager:
+        return participant if isinstance(participant, CalendarManager) else participant.calendar_manager
+
+    def foreign_zone(self, participant) -> Optional[TimeZoneTable]:
+        """
+        TimeZoneTable của participant nếu khác múi giờ tham chiếu, None nếu cùng giờ local.
+        """
+        zone = self.calendar_of(participant).timezone
+        if zone is None or self.timezone is None or zone.key == self.timezone.key:
+            return None
+        return zone
+
+    def busy_stream(self, participant, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """
+        Các block bận (phút, giờ local tham chiếu) của một participant, theo thứ tự bắt đầu.
+        """
+        zone = self.foreign_zone(participant)
+        if zone is None:
+            return self.local_busy_stream(participant, start, end)
+        reference = self.timezone
+        # Đổi khoảng truy vấn sang giờ local của participant (thêm một ngày mỗi phía cho offset)
+        local_start = zone.utc_to_local(reference.local_to_utc(start)) - MINUTES_PER_DAY
+        local_end = zone.utc_to_local(reference.local_to_utc(end)) + MINUTES_PER_DAY
+        calendar = self.calendar_of(participant)
+        local = heapq.merge(self.local_busy_stream(participant, local_start, local_end),
+                            self.off_hours(calendar.work_start_hour, calendar.work_end_hour, local_start, local_end))
+        # local_to_utc không giảm theo phút local, nên thứ tự được giữ sau khi đổi
+        return ((reference.utc_to_local(zone.local_to_utc(busy_start)),
+                 reference.utc_to_local(zone.local_to_utc(busy_end))) for busy_start, busy_end in local)
+
+    @staticmethod
+    def off_hours(work_start: int, work_end: int, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        # Ngoài giờ làm việc của một participant khác múi giờ được coi là bận
+        day = start // MINUTES_PER_DAY * MINUTES_PER_DAY
+        while day < end:
+            if work_start > 0:
+                yield day, day + work_start * 60
+            if work_end < 24:
+                yield day + work_end * 60, day + MINUTES_PER_DAY
+            day += MINUTES_PER_DAY
+
+    def local_busy_stream(self, participant, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        calendar = self.calendar_of(participant)
+        busy = calendar.busy_index.iter_minutes(start, end)
+        if isinstance(participant, CalendarManager):
+            return busy
+        tasks = sorted(
+            (to_minutes(task.scheduled_start), to_minutes(task.scheduled_end))
+            for task in participant.iter_all_tasks()
+            if task.scheduled_start and task.scheduled_end
+            and task.scheduled_start < from_minutes(end) and task.scheduled_end > from_minutes(start)
+        )
+        return heapq.merge(busy, tasks)
+
+    def common_work_hours(self) -> Tuple[int, int]:
+        # Giờ làm của participant khác múi giờ đã nằm trong busy_stream (off_hours)
+        calendars = [self.calendar_of(p) for p in self.participants if self.foreign_zone(p) is None]
+        return (max((c.work_start_hour for c in calendars), default=0),
+                min((c.work_end_hour for c in calendars), default=24))
+
+    def iter_common_gaps(self, start: datetime.datetime, end: datetime.datetime,
+                         min_minutes: int = 1) -> Iterator[TimeSlot]:
+        """
+        Yield các khoảng trống chung (theo thứ tự thời gian) dài ít nhất `min_minutes`.
+        `start`/`end` with an offset are converted to the reference zone first.
+        """
+        start, end = to_local_naive(start, self.timezone), to_local_naive(end, self.timezone)
+        range_start, range_end = to_minutes(start), to_minutes(end)
+        work_start, work_end = self.common_work_hours()
+        if work_start >= work_end:
+            return
+        merged = heapq.merge(*(self.busy_stream(p, range_start, range_end) for p in self.participants))
+
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        cursor = range_start
+        busy_start, busy_end = next(merged, (range_end, range_end))
+        while day < end:
+            window_start = max(range_start, to_minutes(day) + work_start * 60)
+            window_end = min(range_end, to_minutes(day) + work_end * 60)
+            cursor = max(cursor, window_start)
+            while cursor < window_end:
+                # Bỏ qua các block bận đã kết thúc trước cursor
+                while busy_end <= cursor:
+                    busy_start, busy_end = next(merged, (range_end, range_end))
+                if busy_start > cursor:
+                    gap_end = min(busy_start, window_end)
+                    if gap_end - cursor >= min_minutes:
+                        yield TimeSlot(from_minutes(cursor), from_minutes(gap_end))
+                    cursor = gap_end
+                else:
+                    cursor = busy_end
+            day += datetime.timedelta(days=1)
+
+    def earliest_slots(self, start: datetime.datetime, end: datetime.datetime, duration_minutes: int,
+                       limit: int = 5) -> List[TimeSlot]:
+        slots = []
+        for gap in self.iter_common_gaps(start, end, duration_minutes):
+            slots.append(TimeSlot(gap.start, gap.start + datetime.timedelta(minutes=duration_minutes)))
+            if len(slots) >= limit:
+                break
+        return slots
+
+    def best_slots(self, start: datetime.datetime, end: datetime.datetime, duration_minutes: int,
+                   limit: int = 5, scorer: Optional[SlotScorer] = None, meeting: Optional[Task] = None,
+                   step_minutes: int = 30) -> List[Tuple[TimeSlot, float]]:
+        """
+        Xếp hạng các vị trí ứng viên bằng SlotScorer; mỗi gap thử các điểm bắt đầu cách nhau `step_minutes`.
+        Returns up to `limit` (slot, score) pairs, best first (earlier slot wins ties).
+        """
+        if scorer is None:
+            work_start, work_end = self.common_work_hours()
+            scorer = SlotScorer({"work_start_hour": work_start, "work_end_hour": work_end})
+        if meeting is None:
+            meeting = Task(id=0, description="meeting", duration_minutes=duration_minutes, priority=Priority.MEDIUM)
+        duration = datetime.timedelta(minutes=duration_minutes)
+        step = datetime.timedelta(minutes=max(1, step_minutes))
+
+        def candidates():
+            order = 0
+            for gap in self.iter_common_gaps(start, end, duration_minutes):
+                slot_start = gap.start
+                while slot_start + duration <= gap.end:
+                    slot = TimeSlot(slot_start, slot_start + duration)
+                    yield scorer.score_slot(slot, meeting).total, -order, slot
+                    order += 1
+                    slot_start += step
+
+        return [(slot, score) for score, _, slot in heapq.nlargest(limit, candidates(), key=lambda c: (c[0], c[1]))]
@@ -0,0 +1,87 @@
+import datetime
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Tuple
+from src.models import Task
+
+
+class RecurrenceExpander:
+    """
+    Giữ các task lặp lại (template) và sinh instance theo từng ngày khi cần.
+    Instances are built only for days the scheduler actually asks for and kept in a per-day LRU
+    cache of `max_cached_days` entries, so memory stays flat however long a rule runs. Instances
+    that already have a placement are moved to `placed` (keyed by (template id, day)) when their
+    day is evicted and reused when the day is built again; only unplaced expansions are dropped.
+    """
+    def __init__(self, max_cached_days: int = 31):
+        self.max_cached_days = max_cached_days
+        self.templates: Dict[int, Task] = {}
+        self.cache: "OrderedDict[datetime.date, List[Task]]" = OrderedDict()
+        self.placed: Dict[Tuple[int, datetime.date], Task] = {}
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def add(self, template: Task):
+        self.remove(template.id)
+        self.templates[template.id] = template
+        # Bổ sung instance cho các ngày đã có trong cache, giữ nguyên các instance đã lên lịch
+        for day, instances in self.cache.items():
+            if template.recurrence.occurs_on(day):
+                instances.append(template.occurrence_for(day))
+
+    def remove(self, task_id: int):
+        if self.templates.pop(task_id, None) is None:
+            return
+        for day, instances in self.cache.items():
+            instances[:] = [task for task in instances if task.id != task_id]
+        for key in [key for key in self.placed if key[0] == task_id]:
+            del self.placed[key]
+
+    def instances_for(self, day: datetime.date) -> List[Task]:
+        if isinstance(day, datetime.datetime):
+            day = day.date()
+        instances = self.cache.get(day)
+        if instances is not None:
+            self.cache.move_to_end(day)
+            return instances
+        instances = [
+            self.placed.pop((template.id, day), None) or template.occurrence_for(day)
+            for template in self.templates.values()
+            if template.recurrence.occurs_on(day)
+        ]
+        self.cache[day] = instances
+        if len(self.cache) > self.max_cached_days:
+            evicted_day, evicted = self.cache.popitem(last=False)
+            for task in evicted:
+                if task.scheduled_start is not None:
+                    self.placed[(task.id, evicted_day)] = task
+        return instances
+
+    def built_instances(self, day: datetime.date) -> List[Task]:
+        """
+        Các instance đã sinh của một ngày (trong cache hoặc đã lên lịch rồi bị đẩy ra), không sinh thêm.
+        """
+        if isinstance(day, datetime.datetime):
+            day = day.date()
+        instances = self.cache.get(day)
+        if instances is not None:
+            return instances
+        return [task for (task_id, placed_day), task in self.placed.items() if placed_day == day]
+
+    def iter_cached(self, start: datetime.datetime, end: datetime.datetime) -> Iterator[Task]:
+        """
+        Yield các instance đã sinh (trong cache hoặc đã lên lịch) có ngày nằm trong [start, end), theo thứ tự ngày.
+        """
+        placed_by_day: Dict[datetime.date, List[Task]] = {}
+        for (task_id, day), task in self.placed.items():
+            placed_by_day.setdefault(day, []).append(task)
+        for day in sorted(set(self.cache) | set(placed_by_day)):
+            if start.date() <= day and datetime.datetime.combine(day, datetime.time()) < end:
+                yield from self.cache.get(day, ())
+                yield from placed_by_day.get(day, ())
+
+    def iter_all(self) -> Iterator[Task]:
+        """
+        Yield mọi instance đã sinh, theo thứ tự ngày.
+        """
+        yield from self.iter_cached(datetime.datetime.min, datetime.datetime.max)
@@ -0,0 +1,184 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from .EventSink import INFO, PLACED
+from .ScoringPlan import FACTORS
+
+# Một placement: [task_id, occurrence_date | None, scheduled_start, scheduled_end] (ISO strings)
+Placement = List
+
+
+class ScheduleCache:
+    """
+    LRU cache kết quả schedule_tasks, khóa bằng hash nội dung của input.
+    The key covers every task field (in order, dependencies included), the settings, scorer weights, the registered
+    scoring factors (a factor added or replaced at runtime changes scores), busy blocks, the
+    target date and a clock bucket: time-based factors depend on "now", so a cached plan is only
+    reused within the same `clock_bucket_minutes` window. Values are the placements made by the pass.
+    With `path`, entries are loaded at startup and written back by save().
+    """
+    def __init__(self, max_entries: int = 256, path: Optional[str] = None, clock_bucket_minutes: int = 15):
+        self.max_entries = max_entries
+        self.path = path
+        self.clock_bucket_minutes = clock_bucket_minutes
+        self.entries: "OrderedDict[str, List[Placement]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # --- Key ---
+
+    def clock_bucket(self, now: Optional[datetime.datetime] = None) -> str:
+        now = now or datetime.datetime.now()
+        minutes = (now.hour * 60 + now.minute) // self.clock_bucket_minutes * self.clock_bucket_minutes
+        return f"{now.date().isoformat()}T{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def make_key(self, scheduler, target_date: datetime.datetime, now: Optional[datetime.datetime] = None) -> str:
+        digest = hashlib.sha256()
+
+        def feed(value):
+            digest.update(json.dumps(value, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+            digest.update(b"\x00")
+
+        feed(scheduler.settings)
+        feed(scheduler.slot_scorer.weights)
+        feed([factor_fingerprint(factor) for factor in FACTORS.values()])
+        feed([target_date.isoformat(), self.clock_bucket(now)])
+        for task in scheduler.tasks:
+            feed(task_fingerprint(task))
+        for template in scheduler.recurrence.templates.values():
+            feed(task_fingerprint(template))
+        for instance in scheduler.recurrence.built_instances(target_date):
+            feed(task_fingerprint(instance))
+        busy_index = scheduler.calendar_manager.busy_index
+        digest.update(busy_index.starts.tobytes())
+        digest.update(busy_index.ends.tobytes())
+        return digest.hexdigest()
+
+    # --- LRU ---
+
+    def get(self, key: str) -> Optional[List[Placement]]:
+        with self.lock:
+            placements = self.entries.get(key)
+            if placements is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return placements
+
+    def put(self, key: str, placements: List[Placement]):
+        with self.lock:
+            self.entries[key] = placements
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    # --- Scheduling ---
+
+    def schedule(self, scheduler, target_date: datetime.datetime):
+        """
+        Áp dụng kết quả đã cache nếu có, nếu không thì chạy một lượt lên lịch và lưu lại.
+        """
+        key = self.make_key(scheduler, target_date, scheduler.slot_scorer.clock())
+        placements = self.get(key)
+        if placements is not None:
+            apply_placements(scheduler, target_date, placements)
+            return
+        before = {id(task) for task in pending_tasks_for(scheduler, target_date)}
+        scheduler.run_schedule_pass(target_date)
+        placements = [
+            [task.id, task.occurrence_date.isoformat() if task.occurrence_date else None,
+             task.scheduled_start.isoformat(), task.scheduled_end.isoformat()]
+            for task in pending_tasks_for(scheduler, target_date, include_scheduled=True)
+            if id(task) in before and task.scheduled_start is not None
+        ]
+        self.put(key, placements)
+
+    # --- Persistence ---
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self.lock:
+            self.entries = OrderedDict(data.get("entries", []))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        with self.lock:
+            data = {"version": 1, "entries": list(self.entries.items())}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def callable_name(func) -> Optional[str]:
+    if func is None or isinstance(func, str):
+        return func
+    return f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', repr(func))}"
+
+def factor_fingerprint(factor) -> List:
+    return [factor.name, factor.kind, callable_name(factor.func), list(factor.bounds),
+            callable_name(factor.breakpoints)]
+
+def task_fingerprint(task) -> List:
+    return [
+        task.id, task.description, task.duration_minutes, task.priority.name,
+        task.due_date, task.preferred_time, task.energy_level, task.project_id,
+        task.scheduled_start, task.scheduled_end, repr(task.recurrence), task.occurrence_date,
+        list(task.depends_on),
+    ]
+
+def pending_tasks_for(scheduler, target_date: datetime.datetime, include_scheduled: bool = False):
+    for task in scheduler.tasks:
+        if include_scheduled or task.scheduled_start is None:
+            yield task
+    if len(scheduler.recurrence):
+        for task in scheduler.recurrence.instances_for(target_date):
+            if include_scheduled or task.scheduled_start is None:
+                yield task
+
+def apply_placements(scheduler, target_date: datetime.datetime, placements: List[Placement]):
+    by_key = {(task_id, occurrence): (start, end) for task_id, occurrence, start, end in placements}
+    for task in pending_tasks_for(scheduler, target_date):
+        occurrence = task.occurrence_date.isoformat() if task.occurrence_date else None
+        placement = by_key.get((task.id, occurrence))
+        if placement is None:
+            continue
+        task.scheduled_start = datetime.datetime.fromisoformat(placement[0])
+        task.scheduled_end = datetime.datetime.fromisoformat(placement[1])
+        if task.occurrence_date is None:
+            scheduler.scheduled_tasks.append(task)
+        # Chỉ sink đếm mới tới được đây (xem AIScheduler.can_use_result_cache): giữ số PLACED đúng
+        if scheduler.events.enabled(INFO):
+            scheduler.events.emit(PLACED, task, start=task.scheduled_start, end=task.scheduled_end)
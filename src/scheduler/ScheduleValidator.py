@@ -0,0 +1,117 @@
+import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src.models import Task
+from .BusyIndex import to_minutes, from_minutes
+
+MINUTES_PER_DAY = 24 * 60
+
+MISSING_START = "missing_start"
+MISSING_END = "missing_end"
+END_BEFORE_START = "end_before_start"
+
+
+class ConflictGroup:
+    """
+    Một cụm các task cố định chồng lên nhau (liên thông theo overlap), với khoảng bao [start, end).
+    """
+    def __init__(self, start: datetime.datetime, end: datetime.datetime, tasks: List[Task]):
+        self.start = start
+        self.end = end
+        self.tasks = tasks
+
+    def __repr__(self) -> str:
+        ids = ", ".join(str(task.id) for task in self.tasks)
+        return f"ConflictGroup(start='{self.start.isoformat()}', end='{self.end.isoformat()}', tasks=[{ids}])"
+
+
+class ValidationReport:
+    def __init__(self):
+        self.checked = 0
+        self.conflicts: List[ConflictGroup] = []
+        self.outside_work_hours: List[Task] = []
+        self.invalid: List[Tuple[Task, str]] = []
+
+    @property
+    def ok(self) -> bool:
+        return not (self.conflicts or self.outside_work_hours or self.invalid)
+
+    def busy_blocks(self) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+        for group in self.conflicts:
+            yield group.start, group.end
+
+    def as_dict(self) -> Dict:
+        return {
+            "checked": self.checked,
+            "conflicts": [{"start": group.start.isoformat(), "end": group.end.isoformat(),
+                           "tasks": [task.id for task in group.tasks]} for group in self.conflicts],
+            "outside_work_hours": [task.id for task in self.outside_work_hours],
+            "invalid": [{"task": task.id, "reason": reason} for task, reason in self.invalid],
+        }
+
+    def report(self) -> str:
+        lines = [f"checked {self.checked} fixed tasks: {len(self.conflicts)} conflicts, "
+                 f"{len(self.outside_work_hours)} outside work hours, {len(self.invalid)} invalid"]
+        for group in self.conflicts:
+            ids = ", ".join(str(task.id) for task in group.tasks)
+            lines.append(f"  conflict {group.start.strftime('%Y-%m-%d %H:%M')} - {group.end.strftime('%H:%M')}: tasks {ids}")
+        for task in self.outside_work_hours:
+            lines.append(f"  outside work hours: task {task.id} "
+                         f"({task.scheduled_start.strftime('%Y-%m-%d %H:%M')} - {task.scheduled_end.strftime('%H:%M')})")
+        for task, reason in self.invalid:
+            lines.append(f"  invalid: task {task.id} ({reason})")
+        return "\n".join(lines)
+
+
+class ScheduleValidator:
+    """
+    Kiểm tra hàng loạt các task đã có scheduled_start/scheduled_end (task cố định).
+    Blocks are converted to integer minutes, sorted once and swept with a running max end, so the
+    whole pass is O(n log n). Overlaps are reported per connected cluster rather than per pair,
+    which keeps the output linear even when many blocks pile up on the same time.
+    """
+    def __init__(self, work_start_hour: int = 9, work_end_hour: int = 17):
+        self.work_start_minute = work_start_hour * 60
+        self.work_end_minute = work_end_hour * 60
+
+    def validate(self, tasks: Iterable[Task]) -> ValidationReport:
+        report = ValidationReport()
+        blocks: List[Tuple[int, int, int, Task]] = []
+        for seq, task in enumerate(tasks):
+            start, end = task.scheduled_start, task.scheduled_end
+            if start is None and end is None:
+                continue
+            report.checked += 1
+            if start is None:
+                report.invalid.append((task, MISSING_START))
+                continue
+            if end is None:
+                report.invalid.append((task, MISSING_END))
+                continue
+            start_minute = to_minutes(start)
+            end_minute = to_minutes(end)
+            if end_minute <= start_minute:
+                report.invalid.append((task, END_BEFORE_START))
+                continue
+            # Ngoài giờ làm việc: tính theo ngày của scheduled_start (task qua đêm luôn bị báo)
+            day_minute = start_minute - start_minute % MINUTES_PER_DAY
+            if (start_minute < day_minute + self.work_start_minute
+                    or end_minute > day_minute + self.work_end_minute):
+                report.outside_work_hours.append(task)
+            blocks.append((start_minute, end_minute, seq, task))
+
+        blocks.sort() # seq là duy nhất nên không bao giờ so sánh tới Task
+        cluster: List[Task] = []
+        cluster_start = cluster_end = 0
+        for start_minute, end_minute, _, task in blocks:
+            if cluster and start_minute < cluster_end:
+                cluster.append(task)
+                if end_minute > cluster_end:
+                    cluster_end = end_minute
+                continue
+            if len(cluster) > 1:
+                report.conflicts.append(ConflictGroup(from_minutes(cluster_start), from_minutes(cluster_end), cluster))
+            cluster = [task]
+            cluster_start, cluster_end = start_minute, end_minute
+        if len(cluster) > 1:
+            report.conflicts.append(ConflictGroup(from_minutes(cluster_start), from_minutes(cluster_end), cluster))
+        return report
@@ -0,0 +1,53 @@
+import time
+from typing import Dict
+
+
+class SchedulerStats:
+    """
+    Bộ đếm thời gian và bộ đếm sự kiện cho một hoặc nhiều lần chạy schedule_tasks.
+    Components hold `stats = None` when profiling is off, so the disabled cost is one attribute
+    check per phase; timings use time.perf_counter and are accumulated in seconds.
+    """
+    def __init__(self):
+        self.timers: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    now = staticmethod(time.perf_counter)
+
+    def add_time(self, name: str, seconds: float):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def incr(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        self.timers.clear()
+        self.calls.clear()
+        self.counters.clear()
+
+    def as_dict(self) -> Dict:
+        return {
+            "timers": {
+                name: {"seconds": seconds, "calls": self.calls.get(name, 0)}
+                for name, seconds in self.timers.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def report(self) -> str:
+        lines = ["phase                               calls      total_ms    avg_us"]
+        for name, seconds in sorted(self.timers.items(), key=lambda item: -item[1]):
+            calls = self.calls.get(name, 0)
+            avg_us = seconds / calls * 1e6 if calls else 0.0
+            lines.append(f"{name:<34} {calls:>8} {seconds * 1000:>12.3f} {avg_us:>9.2f}")
+        if self.counters:
+            lines.append("")
+            lines.append("counter                             value")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<34} {value:>8}")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"SchedulerStats(timers={len(self.timers)}, counters={self.counters})"
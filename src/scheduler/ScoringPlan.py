@@ -0,0 +1,205 @@
+import datetime
+import math
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from src.models import Task, TimeSlot
+
+ONE_HOUR = datetime.timedelta(hours=1)
+ONE_MINUTE = datetime.timedelta(minutes=1)
+
+# Loại phụ thuộc của một factor
+TASK_ONLY = "task"
+SLOT_ONLY = "slot"
+PAIR = "pair"
+FACTOR_KINDS = (TASK_ONLY, SLOT_ONLY, PAIR)
+
+
+def slot_hour(slot: TimeSlot) -> int:
+    return slot.start.hour
+
+def slot_duration(slot: TimeSlot) -> float:
+    return slot.duration_minutes
+
+def slot_span(slot: TimeSlot) -> Tuple:
+    return slot.start, slot.end
+
+
+class ScoringFactor:
+    """
+    Một factor chấm điểm: tên, loại phụ thuộc, hàm tính, trọng số mặc định và khoảng giá trị.
+    `bounds` must hold for every slot the scorer may see (including slots before "now"); use None
+    for a side without a true limit, which turns off the early exit of SlotScorer.best_slot.
+    `func` is a SlotScorer method name or a callable taking the scorer first; it is called with
+    (task) for task-only factors, (slot) for slot-only factors and (slot, task) for pair factors.
+    Slot-only factors name the part of the slot their value depends on with `key(slot)` (start
+    hour, duration, ...); the plan uses it as the key of a lookup table.
+
+    For placement inside free gaps a factor's value, as a function of the start time, is assumed
+    to be constant or non-increasing between whole hours. Factors that can rise elsewhere (e.g.
+    towards another task) give `breakpoints`, called with (task, first, last, duration) and
+    returning the start times where their slope changes; between two breakpoints they must be
+    monotone.
+    """
+    def __init__(self, name: str, kind: str, func: Union[str, Callable], default_weight: float = 1.0,
+                 bounds: Tuple[Optional[float], Optional[float]] = (0.0, 1.0), key: Optional[Callable] = None,
+                 breakpoints: Union[str, Callable, None] = None):
+        if kind not in FACTOR_KINDS:
+            raise ValueError(f"Unknown factor kind {kind!r} (expected one of {', '.join(FACTOR_KINDS)})")
+        low = -math.inf if bounds[0] is None else float(bounds[0])
+        high = math.inf if bounds[1] is None else float(bounds[1])
+        if low > high:
+            raise ValueError(f"Invalid bounds for factor {name!r}: {bounds}")
+        self.name = name
+        self.kind = kind
+        self.func = func
+        self.default_weight = float(default_weight)
+        self.bounds = (low, high)
+        self.key = key if key is not None else slot_span
+        self.breakpoints = breakpoints
+
+    def __repr__(self) -> str:
+        return f"ScoringFactor({self.name}, {self.kind}, bounds={self.bounds})"
+
+    def bind(self, scorer, func: Union[str, Callable, None] = None) -> Callable:
+        func = self.func if func is None else func
+        if isinstance(func, str):
+            return getattr(scorer, func)
+        return lambda *args: func(scorer, *args)
+
+
+# Registry theo thứ tự đăng ký; thứ tự này là thứ tự cộng điểm và thứ tự của dict factors
+FACTORS: Dict[str, ScoringFactor] = {}
+# Tăng mỗi khi registry đổi để các plan đã biên dịch tự biên dịch lại
+_registry_version = 0
+
+def register_factor(name: str, kind: str, func: Union[str, Callable], default_weight: float = 1.0,
+                    bounds: Tuple[Optional[float], Optional[float]] = (0.0, 1.0), key: Optional[Callable] = None,
+                    breakpoints: Union[str, Callable, None] = None, replace: bool = False) -> ScoringFactor:
+    """
+    Đăng ký một factor cho mọi SlotScorer tạo sau đó (và các plan sẽ được biên dịch lại).
+    Raises ValueError if the name is taken, unless `replace`.
+    """
+    global _registry_version
+    if name in FACTORS and not replace:
+        raise ValueError(f"Scoring factor {name!r} is already registered")
+    factor = FACTORS[name] = ScoringFactor(name, kind, func, default_weight, bounds, key, breakpoints)
+    _registry_version += 1
+    return factor
+
+def unregister_factor(name: str) -> bool:
+    global _registry_version
+    if name in BUILTIN_FACTORS:
+        raise ValueError(f"Built-in scoring factor {name!r} cannot be removed (set its weight to 0 instead)")
+    if FACTORS.pop(name, None) is None:
+        return False
+    _registry_version += 1
+    return True
+
+def default_weights() -> Dict[str, float]:
+    return {name: factor.default_weight for name, factor in FACTORS.items()}
+
+
+class ScoringPlan:
+    """
+    Các factor và trọng số của một SlotScorer, biên dịch một lần thành các bước tính điểm.
+    Factors with zero weight are dropped from the totals. Per task, task-only terms are evaluated
+    once (`for_task`), slot-only terms come from per-factor tables keyed by `key(slot)` and filled
+    on first use, and only pair terms are called for every slot. Terms are still added in registry
+    order, so totals are bit-identical to SlotScorer.score_slot.
+    """
+    def __init__(self, scorer, weights: Dict[str, float]):
+        self.weights = dict(weights)
+        self.version = _registry_version
+        self.calls: List[Tuple[str, str, Callable]] = [
+            (name, factor.kind, factor.bind(scorer)) for name, factor in FACTORS.items()]
+        self.total_weight = sum(weights.values())
+        self.slot_tables: Dict[str, Dict] = {}
+        # (loại, trọng số, factor đã bind, key, bảng) của các factor có trọng số khác 0
+        self.terms = []
+        # Phần đóng góp lớn nhất có thể của các term slot-only và pair, theo bounds
+        self.slot_pair_high = 0.0
+        self.breakpoint_calls: List[Callable] = []
+        for name, kind, func in self.calls:
+            weight = weights.get(name, 0.0)
+            if not weight:
+                continue
+            factor = FACTORS[name]
+            table = self.slot_tables.setdefault(name, {}) if kind == SLOT_ONLY else None
+            self.terms.append((kind, weight, func, factor.key, table))
+            if kind != TASK_ONLY:
+                self.slot_pair_high += max(weight * factor.bounds[0], weight * factor.bounds[1])
+            if factor.breakpoints is not None:
+                self.breakpoint_calls.append(factor.bind(scorer, factor.breakpoints))
+
+    def is_current(self, weights: Dict[str, float]) -> bool:
+        return self.version == _registry_version and self.weights == weights
+
+    def candidate_starts(self, task: Task, first: datetime.datetime, last: datetime.datetime,
+                         duration: datetime.timedelta) -> List[datetime.datetime]:
+        """
+        Các thời điểm bắt đầu cần thử trong [first, last]: first, mỗi mốc giờ tròn và breakpoint của các factor.
+        Between two consecutive candidates the score is piecewise constant plus monotone terms, so
+        it peaks at a piece's first minute, or at its last minute when a factor with breakpoints
+        rises through it; those minutes (and `last`) are added then.
+        """
+        starts = {first}
+        hour = first.replace(minute=0, second=0, microsecond=0) + ONE_HOUR
+        while hour <= last:
+            starts.add(hour)
+            hour += ONE_HOUR
+        if self.breakpoint_calls:
+            for breakpoints in self.breakpoint_calls:
+                starts.update(start for start in breakpoints(task, first, last, duration) if first <= start <= last)
+            starts.update([start - ONE_MINUTE for start in starts if start > first])
+            starts.add(last)
+        return sorted(starts)
+
+    def for_task(self, task: Task) -> Tuple[Callable[[TimeSlot], float], float]:
+        """
+        (hàm slot -> tổng điểm cho `task`, tổng điểm lớn nhất có thể đạt theo bounds).
+        Task-only terms are evaluated here, once.
+        """
+        steps = []
+        task_sum = 0.0
+        for kind, weight, func, key, table in self.terms:
+            if kind == TASK_ONLY:
+                value = func(task) * weight
+                task_sum += value
+                steps.append((TASK_ONLY, value, None, None, None))
+            else:
+                steps.append((kind, weight, func, key, table))
+        total_weight = self.total_weight
+        upper = (task_sum + self.slot_pair_high) / total_weight if total_weight > 0 else 0
+
+        def score(slot: TimeSlot) -> float:
+            if total_weight <= 0:
+                return 0
+            weighted_sum = 0.0
+            for kind, weight, func, key, table in steps:
+                if kind == TASK_ONLY:
+                    weighted_sum += weight
+                elif kind == SLOT_ONLY:
+                    slot_key = key(slot)
+                    value = table.get(slot_key)
+                    if value is None:
+                        value = table[slot_key] = func(slot)
+                    weighted_sum += value * weight
+                else:
+                    weighted_sum += func(slot, task) * weight
+            return weighted_sum / total_weight
+
+        return score, upper
+
+
+# Các factor có sẵn (method của SlotScorer), luôn đứng đầu registry theo đúng thứ tự cộng điểm cũ
+BUILTIN_FACTORS = ("work_hour_alignment", "energy_level_match", "project_proximity", "buffer_adequacy",
+                   "time_preference", "deadline_proximity", "priority_score")
+
+register_factor("work_hour_alignment", SLOT_ONLY, "score_work_hour_alignment", 1.0, key=slot_hour)
+register_factor("energy_level_match", PAIR, "score_energy_level_match", 1.5)
+register_factor("project_proximity", PAIR, "score_project_proximity", 0.5,
+                breakpoints="project_proximity_breakpoints")
+register_factor("buffer_adequacy", SLOT_ONLY, "score_buffer_adequacy", 0.8, key=slot_duration)
+register_factor("time_preference", PAIR, "score_time_preference", 1.2)
+# Task quá hạn + slot trước "now": time_penalty âm nên điểm vượt 2.0, không có cận trên thật
+register_factor("deadline_proximity", PAIR, "score_deadline_proximity", 3.0, bounds=(0.1, None))
+register_factor("priority_score", TASK_ONLY, "score_priority", 1.8, bounds=(0.25, 1.2))
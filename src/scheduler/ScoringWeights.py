@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+# File trọng số: {"version": 1, "factors": [...], "default": {factor: w}, "users": {user: {factor: w}}}
+WEIGHTS_FILE_VERSION = 1
+
+
+class ScoringWeights:
+    """
+    Trọng số đã học cho SlotScorer: một bộ mặc định và các bộ theo user.
+    Files are parsed once per (path, mtime) and shared by every scorer in the process, so
+    constructing many schedulers does not re-read the file and scoring itself only sees a dict.
+    """
+    _loaded: Dict[str, Tuple[float, "ScoringWeights"]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, default: Optional[Dict[str, float]] = None, users: Optional[Dict[str, Dict[str, float]]] = None,
+                 meta: Optional[Dict] = None):
+        self.default: Dict[str, float] = dict(default) if default else {}
+        self.users: Dict[str, Dict[str, float]] = {user: dict(weights) for user, weights in (users or {}).items()}
+        self.meta: Dict = dict(meta) if meta else {}
+
+    def for_user(self, user: Optional[str], base: Dict[str, float]) -> Dict[str, float]:
+        """
+        Trọng số cho `user`: bắt đầu từ `base`, ghi đè bằng bộ mặc định rồi bộ của user (nếu có).
+        Unknown factor names are ignored so an old file cannot add terms the scorer does not compute.
+        """
+        weights = dict(base)
+        for source in (self.default, self.users.get(user) if user is not None else None):
+            if source:
+                for name, value in source.items():
+                    if name in weights:
+                        weights[name] = float(value)
+        return weights
+
+    def as_dict(self) -> Dict:
+        factors = list(self.default) if self.default else sorted({name for w in self.users.values() for name in w})
+        return {"version": WEIGHTS_FILE_VERSION, "factors": factors, "default": self.default,
+                "users": self.users, "meta": self.meta}
+
+    def save(self, path: str):
+        # Ghi ra file tạm rồi rename để scheduler đang chạy không đọc phải file dở dang
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScoringWeights":
+        if data.get("version", WEIGHTS_FILE_VERSION) != WEIGHTS_FILE_VERSION:
+            raise ValueError(f"Unsupported weights file version: {data.get('version')}")
+        return cls(default=data.get("default"), users=data.get("users"), meta=data.get("meta"))
+
+    @classmethod
+    def load(cls, path: str) -> "ScoringWeights":
+        mtime = os.stat(path).st_mtime
+        with cls._lock:
+            cached = cls._loaded.get(path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            weights = cls.from_dict(json.load(f))
+        with cls._lock:
+            cls._loaded[path] = (mtime, weights)
+        return weights
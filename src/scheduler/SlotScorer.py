@@ -1,6 +1,8 @@
 import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 from src.models import Task, TimeSlot, Priority
+from .ScoringPlan import ScoringPlan, FACTORS, BUILTIN_FACTORS, TASK_ONLY, SLOT_ONLY, PAIR, default_weights
+from .ScoringWeights import ScoringWeights
 
 
 class SlotScore:
@@ -12,10 +14,28 @@ class SlotScore:
         factor_str = ", ".join([f"{key}={value:.2f}" for key, value in self.factors.items()])
         return f"SlotScore(total={self.total:.2f}, factors=[{factor_str}])"
 
+# Trọng số mặc định của các factor có sẵn (khai báo trong ScoringPlan), theo thứ tự cộng điểm
+DEFAULT_WEIGHTS = {name: FACTORS[name].default_weight for name in BUILTIN_FACTORS}
+
 class SlotScorer:
     def __init__(self, settings: Dict):
         self.settings = settings
         self.scheduled_tasks_by_project: Dict[str, List[Task]] = {}
+        # Trọng số mặc định của mọi factor đã đăng ký (các factor có sẵn + factor tự thêm)
+        self.weights: Dict[str, float] = default_weights()
+        # Trọng số đã học (offline) thay cho bộ mặc định, theo user nếu file có
+        if settings.get("weights_file"):
+            self.weights = ScoringWeights.load(settings["weights_file"]).for_user(settings.get("weights_user"), self.weights)
+        # Ghi đè trực tiếp từng trọng số, ví dụ {"deadline_proximity": 4.0}
+        if settings.get("weights"):
+            self.weights.update((name, float(value)) for name, value in settings["weights"].items() if name in self.weights)
+        # SchedulerStats khi bật profiling, None khi tắt
+        self.stats = None
+        # DayProfile dùng chung (bảng tra theo giờ), None thì tính trực tiếp
+        self.day_profile = None
+        # "Bây giờ" theo giờ local naive của user; AIScheduler thay bằng TimeZoneTable.now khi có timezone
+        self.clock: Callable[[], datetime.datetime] = datetime.datetime.now
+        self.plan: Optional[ScoringPlan] = None
 
     def update_scheduled_tasks_for_projects(self, tasks: List[Task]):
         self.scheduled_tasks_by_project.clear()
@@ -26,31 +46,82 @@ class SlotScorer:
             if task.scheduled_start and task.scheduled_end:
                 self.scheduled_tasks_by_project[project_id].append(task)
 
+    def get_plan(self) -> ScoringPlan:
+        # Biên dịch lại khi trọng số hoặc registry factor thay đổi
+        plan = self.plan
+        if plan is None or not plan.is_current(self.weights):
+            plan = self.plan = ScoringPlan(self, self.weights)
+        return plan
+
     def score_slot(self, slot: TimeSlot, task: Task) -> SlotScore:
-        factors = {
-            "work_hour_alignment": self.score_work_hour_alignment(slot),
-            "energy_level_match": self.score_energy_level_match(slot, task),
-            "project_proximity": self.score_project_proximity(slot, task),
-            "buffer_adequacy": self.score_buffer_adequacy(slot),
-            "time_preference": self.score_time_preference(slot, task),
-            "deadline_proximity": self.score_deadline_proximity(slot, task),
-            "priority_score": self.score_priority(task),
-        }
-        weights = {
-            "work_hour_alignment": 1.0,
-            "energy_level_match": 1.5,
-            "project_proximity": 0.5,
-            "buffer_adequacy": 0.8,
-            "time_preference": 1.2,
-            "deadline_proximity": 3.0,
-            "priority_score": 1.8,
-        }
+        if self.stats is not None:
+            return self.score_slot_profiled(slot, task)
+        factors = {}
+        for name, kind, func in self.get_plan().calls:
+            if kind == PAIR:
+                factors[name] = func(slot, task)
+            elif kind == SLOT_ONLY:
+                factors[name] = func(slot)
+            else:
+                factors[name] = func(task)
+        return self.combine_factors(factors)
+
+    def candidate_starts(self, task: Task, first: datetime.datetime, last: datetime.datetime,
+                         duration: datetime.timedelta) -> List[datetime.datetime]:
+        return self.get_plan().candidate_starts(task, first, last, duration)
+
+    def best_slot(self, slots: List[TimeSlot], task: Task) -> Tuple[Optional[TimeSlot], float]:
+        """
+        (slot có điểm cao nhất, điểm) cho `task`; slot đầu tiên thắng khi bằng điểm.
+        Uses the compiled plan (no SlotScore objects or factor dicts) and stops early once a slot
+        reaches the task's upper bound, since no later slot could beat it.
+        """
+        best: Optional[TimeSlot] = None
+        best_score = -1.0
+        if self.stats is not None:
+            for slot in slots:
+                score = self.score_slot(slot, task).total
+                if score > best_score:
+                    best_score, best = score, slot
+            return best, best_score
+        score, upper = self.get_plan().for_task(task)
+        for slot in slots:
+            total = score(slot)
+            if total > best_score:
+                best_score, best = total, slot
+                if total >= upper:
+                    break
+        return best, best_score
+
+    def combine_factors(self, factors: Dict[str, float]) -> SlotScore:
+        weights = self.weights
         total_weight = sum(weights.values())
-        weighted_sum = sum(factors[key] * weights[key] for key in factors)
+        # Factor đăng ký sau khi scorer được tạo có trọng số 0 ở đây, như trong ScoringPlan
+        weighted_sum = sum(factors[key] * weights.get(key, 0.0) for key in factors)
         total_score = weighted_sum / total_weight if total_weight > 0 else 0
         return SlotScore(total=total_score, factors=factors)
 
+    def score_slot_profiled(self, slot: TimeSlot, task: Task) -> SlotScore:
+        """
+        Giống score_slot nhưng đo thời gian từng factor vào self.stats ("score.<factor>").
+        """
+        stats = self.stats
+        now = stats.now
+        args_by_kind = {TASK_ONLY: (task,), SLOT_ONLY: (slot,), PAIR: (slot, task)}
+        factors = {}
+        for name, kind, func in self.get_plan().calls:
+            started = now()
+            factors[name] = func(*args_by_kind[kind])
+            stats.add_time("score." + name, now() - started)
+        started = now()
+        score = self.combine_factors(factors)
+        stats.add_time("score.combine", now() - started)
+        stats.incr("slots_scored")
+        return score
+
     def score_work_hour_alignment(self, slot: TimeSlot) -> float:
+        if self.day_profile is not None:
+            return self.day_profile.work_hour_alignment[slot.start.hour]
         work_start = self.settings.get('work_start_hour', 9)
         work_end = self.settings.get('work_end_hour', 17)
         return 1.0 if work_start <= slot.start.hour < work_end else 0.0
@@ -60,7 +131,10 @@ class SlotScorer:
             return 0.5
         energy_levels_order = ["low", "medium", "high"]
         task_energy = task.energy_level.lower()
-        slot_energy = self.get_energy_level_for_time(slot.start.hour)
+        if self.day_profile is not None:
+            slot_energy = self.day_profile.energy_level[slot.start.hour]
+        else:
+            slot_energy = self.get_energy_level_for_time(slot.start.hour)
         if not slot_energy:
             return 0.5
         try:
@@ -106,7 +180,7 @@ class SlotScorer:
                 start_hour, end_hour = ranges[preference]
                 return 1.0 if start_hour <= hour < end_hour else 0.0
             return 0.0
-        now = datetime.datetime.now()
+        now = self.clock()
         minutes_to_slot = (slot.start - now).total_seconds() / 60
         days_to_slot = minutes_to_slot / (24 * 60)
         return max(0, min(1.0, 0.5 + 0.5 * (1 - days_to_slot / 7))) if days_to_slot < 7 else 0.5
@@ -114,7 +188,7 @@ class SlotScorer:
     def score_deadline_proximity(self, slot: TimeSlot, task: Task) -> float:
         if not task.due_date:
             return 0.5
-        now = datetime.datetime.now()
+        now = self.clock()
         minutes_to_deadline = (task.due_date - now).total_seconds() / 60
         minutes_to_slot = (slot.start - now).total_seconds() / 60
         if minutes_to_deadline < 0:
@@ -142,6 +216,23 @@ class SlotScorer:
                 min_distance_hours = min(min_distance_hours, dist_to_start, dist_to_end)
         return max(0, min(1.0, 1.0 - min_distance_hours / 4))
 
+    def project_proximity_breakpoints(self, task: Task, first: datetime.datetime, last: datetime.datetime,
+                                      duration: datetime.timedelta) -> List[datetime.datetime]:
+        """
+        Các điểm bắt đầu mà project_proximity có thể đạt cực đại hoặc đổi độ dốc: bắt đầu cùng lúc /
+        kết thúc cùng lúc với một task cùng dự án, và cách các mốc đó 4 giờ (điểm về 0).
+        """
+        project_id = getattr(task, 'project_id', None)
+        if not project_id or not self.settings.get('group_by_project', False):
+            return []
+        window = datetime.timedelta(hours=4)
+        points = []
+        for p_task in self.scheduled_tasks_by_project.get(project_id, []):
+            if p_task.scheduled_start and p_task.scheduled_end:
+                for anchor in (p_task.scheduled_start, p_task.scheduled_end - duration):
+                    points.extend((anchor - window, anchor, anchor + window))
+        return points
+
     def score_priority(self, task: Task) -> float:
         if not task.priority or task.priority == Priority.LOW:
             return 0.25
@@ -151,3 +242,4 @@ class SlotScorer:
             Priority.CRITICAL: 1.2,
         }
         return priority_map.get(task.priority, 0.25)
+
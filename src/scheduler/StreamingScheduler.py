@@ -0,0 +1,165 @@
+import datetime
+import heapq
+import itertools
+import pickle
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from src.models import Task
+from .AIScheduler import AIScheduler
+from .BusyIndex import BusyIndex, to_minutes
+from .DayProfile import SharedTables
+from .TimeZoneTable import TimeZoneTable, localize_task_times, to_local_naive
+
+SCHEDULED = "scheduled"
+FIXED = "fixed"
+UNPLACED = "unplaced"
+
+
+class SpillFile:
+    """
+    File tạm chứa các task tràn khỏi heap, đọc lại tuần tự ở cửa sổ sau.
+    Entries are (sequence, task) pickles appended one by one, so writing and reading are both streaming.
+    """
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def write(self, seq: int, task: Task):
+        pickle.dump((seq, task), self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.count += 1
+
+    def __iter__(self) -> Iterator[Tuple[int, Task]]:
+        self.file.seek(0)
+        for _ in range(self.count):
+            yield pickle.load(self.file)
+
+    def close(self):
+        self.file.close()
+
+
+class StreamingScheduler:
+    """
+    Lên lịch từ một nguồn task rất lớn với bộ nhớ cố định.
+    For each day window the source is scanned once and only the `top_k` best candidates (same
+    (priority, due_date, input order) ranking as AIScheduler) are kept in a heap; the rest spill
+    to a temp file. Candidates that cannot be placed are set aside for the next day, and while the
+    day still has free time the heap is refilled from the spill file for another round, so tasks
+    that never fit do not hold the top-K slots. Results are yielded as
+    (status, task) pairs: "fixed" for pre-scheduled tasks, "scheduled" as each day is planned, and
+    finally "unplaced" for everything left, streamed from disk. With top_k >= the backlog size the
+    placements match AIScheduler. Dependencies are only resolved among tasks in the same round.
+    """
+    def __init__(self, settings: Optional[Dict] = None, top_k: int = 256,
+                 shared_tables: Optional[SharedTables] = None):
+        self.settings = settings
+        self.top_k = max(1, top_k)
+        self.shared_tables = shared_tables if shared_tables is not None else SharedTables()
+        # Lịch bận dùng chung cho mọi cửa sổ (cùng API với CalendarManager để import_ics_busy dùng được)
+        self.busy_index = BusyIndex()
+        self.stats = {"tasks_read": 0, "windows": 0, "spilled": 0, "max_heap": 0}
+        self.timezone: Optional[TimeZoneTable] = None
+        if settings and settings.get("timezone"):
+            self.timezone = TimeZoneTable(settings["timezone"])
+
+    def add_busy_block(self, start: datetime.datetime, end: datetime.datetime):
+        self.busy_index.add(to_local_naive(start, self.timezone), to_local_naive(end, self.timezone))
+
+    def add_busy_blocks(self, blocks: Iterable[Tuple[datetime.datetime, datetime.datetime]]):
+        self.busy_index.add_many((to_local_naive(start, self.timezone), to_local_naive(end, self.timezone))
+                                 for start, end in blocks)
+
+    @staticmethod
+    def goodness(seq: int, task: Task) -> Tuple:
+        # Heap là min-heap theo "độ tốt": gốc là task kém nhất đang giữ
+        due = to_minutes(task.due_date) if task.due_date else float("inf")
+        return (task.priority.value, -due, -seq)
+
+    def schedule(self, source: Iterable[Task], start_date: datetime.datetime, days: int = 1) -> Iterator[Tuple[str, Task]]:
+        start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end_date = start_date + datetime.timedelta(days=max(1, days))
+        templates: List[Task] = []
+        fixed_by_day: Dict[datetime.date, List[Task]] = {}
+        fixed_out: List[Task] = []
+
+        def first_pass() -> Iterator[Tuple[int, Task]]:
+            for seq, task in enumerate(source):
+                self.stats["tasks_read"] += 1
+                localize_task_times(task, self.timezone)
+                if task.recurrence is not None:
+                    templates.append(task)
+                elif task.scheduled_start is not None:
+                    # Task cố định: giữ lại những task rơi vào khoảng đang lên lịch, còn lại chỉ xuất ra
+                    if start_date <= task.scheduled_start < end_date:
+                        fixed_by_day.setdefault(task.scheduled_start.date(), []).append(task)
+                    fixed_out.append(task)
+                else:
+                    yield seq, task
+
+        pending: Iterable[Tuple[int, Task]] = first_pass()
+        # Các file tạm mà `pending` đang đọc; đóng sau khi đã quét xong
+        sources: List[SpillFile] = []
+        for offset in range(max(1, days)):
+            day = start_date + datetime.timedelta(days=offset)
+            scheduler = AIScheduler(settings=self.settings, shared_tables=self.shared_tables)
+            scheduler.calendar_manager.busy_index = self.busy_index
+            first_round = True
+            # Task không xếp được trong ngày: để sang ngày sau, không chiếm chỗ trong top-K của các vòng sau
+            failed = SpillFile()
+            while True:
+                heap: List[Tuple[Tuple, int, Task]] = []
+                next_spill = SpillFile()
+                for seq, task in pending:
+                    item = (self.goodness(seq, task), seq, task)
+                    if len(heap) < self.top_k:
+                        heapq.heappush(heap, item)
+                    else:
+                        # Tập top-K không phụ thuộc thứ tự đọc vì goodness là duy nhất (có seq)
+                        worst = heapq.heappushpop(heap, item)
+                        next_spill.write(worst[1], worst[2])
+                        self.stats["spilled"] += 1
+                    while fixed_out:
+                        yield FIXED, fixed_out.pop()
+                # Task cố định ở cuối nguồn
+                while fixed_out:
+                    yield FIXED, fixed_out.pop()
+                for source_file in sources:
+                    source_file.close()
+                self.stats["max_heap"] = max(self.stats["max_heap"], len(heap))
+                self.stats["windows"] += 1
+
+                candidates = sorted(heap, key=lambda item: item[1])
+                for _, _, task in candidates:
+                    scheduler.add_task(task)
+                if first_round:
+                    # Task cố định và template chỉ được biết sau khi nguồn đã được quét lần đầu
+                    for task in fixed_by_day.pop(day.date(), []):
+                        scheduler.add_task(task)
+                    for template in templates:
+                        scheduler.add_task(template)
+                    first_round = False
+                scheduler.schedule_tasks(target_date=day)
+                for _, seq, task in candidates:
+                    if task.scheduled_start is not None:
+                        yield SCHEDULED, task
+                    else:
+                        failed.write(seq, task)
+                # Chỉ giữ task đã xếp (chúng chặn slot ở vòng sau); task thất bại không được thử lại hôm nay
+                scheduler.tasks = [task for task in scheduler.tasks if task.scheduled_start is not None]
+                del heap, candidates
+
+                # Nạp lại heap từ phần tràn cho tới khi hết task hoặc ngày hết chỗ trống
+                if not next_spill.count or not scheduler.capacity_index(day, 1).free_on_day(day.date()):
+                    break
+                pending, sources = next_spill, [next_spill]
+            for instance in scheduler.recurrence.instances_for(day):
+                if instance.scheduled_start is not None:
+                    yield SCHEDULED, instance
+            del scheduler
+
+            pending, sources = itertools.chain(failed, next_spill), [failed, next_spill]
+
+        for _, task in pending:
+            yield UNPLACED, task
+        for source_file in sources:
+            source_file.close()
+
@@ -0,0 +1,189 @@
+import datetime
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from .BusyIndex import EPOCH, ONE_MINUTE, to_minutes, from_minutes
+
+UTC_EPOCH = EPOCH.replace(tzinfo=datetime.timezone.utc)
+MINUTES_PER_DAY = 24 * 60
+
+
+def year_transitions(zone: ZoneInfo, year: int) -> List[Tuple[int, int]]:
+    """
+    [(phút UTC bắt đầu, offset phút)] của `zone` trong năm `year`, bắt đầu bằng offset lúc 00:00 UTC 1/1.
+    The offset is sampled once per day and each change is bisected down to the minute, so a year
+    costs ~400 tz lookups. At most one transition per day is detected, which holds for real zones.
+    """
+    def offset_at(minute: int) -> int:
+        return from_minutes(minute).replace(tzinfo=datetime.timezone.utc).astimezone(zone).utcoffset() // ONE_MINUTE
+
+    first = to_minutes(datetime.datetime(year, 1, 1))
+    days = (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days
+    previous = offset_at(first)
+    result = [(first, previous)]
+    for day in range(1, days + 1):
+        minute = first + day * MINUTES_PER_DAY
+        offset = offset_at(minute)
+        if offset == previous:
+            continue
+        lo, hi = minute - MINUTES_PER_DAY, minute
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if offset_at(mid) == previous:
+                lo = mid
+            else:
+                hi = mid
+        result.append((hi, offset))
+        previous = offset
+    return result
+
+
+class TimeZoneTable:
+    """
+    Bảng offset UTC (phút) của một múi giờ, tính sẵn theo năm và dùng chung trong process.
+    The scheduler keeps working in naive local wall-clock time; this table converts tz-aware
+    inputs into it and back using integer minutes and a bisect over the transition arrays, so no
+    tz conversion happens per slot. Years are loaded on demand (`prepare` loads a whole horizon).
+    """
+    _years: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, zone):
+        self.zone = ZoneInfo(zone) if isinstance(zone, str) else zone
+        self.key = str(self.zone)
+        self.loaded_years: set = set()
+        self.starts = array('q')
+        self.offsets = array('q')
+        # Khoảng phút UTC đã có trong bảng: [lo, hi)
+        self.lo = self.hi = 0
+        self.fixed_zones: Dict[int, datetime.timezone] = {}
+
+    def __repr__(self) -> str:
+        return f"TimeZoneTable({self.key}, years={sorted(self.loaded_years)})"
+
+    def load_years(self, years):
+        missing = [year for year in years if year not in self.loaded_years]
+        if not missing:
+            return
+        for year in missing:
+            key = (self.key, year)
+            with self._lock:
+                transitions = self._years.get(key)
+            if transitions is None:
+                transitions = year_transitions(self.zone, year)
+                with self._lock:
+                    self._years[key] = transitions
+            self.loaded_years.add(year)
+        entries = sorted(entry for year in self.loaded_years for entry in self._years[(self.key, year)])
+        starts = array('q')
+        offsets = array('q')
+        for start, offset in entries:
+            if offsets and offsets[-1] == offset:
+                continue
+            starts.append(start)
+            offsets.append(offset)
+        self.starts, self.offsets = starts, offsets
+        # Chỉ dùng khoảng năm liên tục chứa năm nhỏ nhất làm vùng "đã biết"
+        first = min(self.loaded_years)
+        last = first
+        while last + 1 in self.loaded_years:
+            last += 1
+        self.lo = to_minutes(datetime.datetime(first, 1, 1))
+        self.hi = to_minutes(datetime.datetime(last + 1, 1, 1))
+
+    def prepare(self, start: datetime.datetime, end: datetime.datetime):
+        """
+        Tính sẵn bảng cho cả horizon [start, end] (thêm một ngày mỗi phía cho offset của múi giờ).
+        """
+        first = (start - datetime.timedelta(days=1)).year
+        last = (end + datetime.timedelta(days=1)).year
+        self.load_years(range(first, last + 1))
+
+    def offset_at_utc(self, minute: int) -> int:
+        if not self.lo <= minute < self.hi:
+            year = from_minutes(minute).year
+            self.load_years(range(min(year, min(self.loaded_years, default=year)),
+                                  max(year, max(self.loaded_years, default=year)) + 1))
+        return self.offsets[bisect_right(self.starts, minute) - 1]
+
+    def utc_to_local(self, minute: int) -> int:
+        return minute + self.offset_at_utc(minute)
+
+    def local_to_utc(self, minute: int, fold: int = 0) -> int:
+        """
+        Phút local -> phút UTC. Ambiguous times (fall back) pick the first occurrence unless fold=1;
+        nonexistent times (spring forward) use the offset before the transition, like zoneinfo.
+        """
+        candidates = sorted({self.offset_at_utc(minute - MINUTES_PER_DAY), self.offset_at_utc(minute),
+                             self.offset_at_utc(minute + MINUTES_PER_DAY)}, reverse=True)
+        valid = [minute - offset for offset in candidates if self.offset_at_utc(minute - offset) == offset]
+        if valid:
+            return valid[0] if fold == 0 else valid[-1]
+        return minute - self.offset_at_utc(minute - MINUTES_PER_DAY)
+
+    def now(self) -> datetime.datetime:
+        """
+        Giờ hiện tại theo giờ local của múi giờ (naive), thay cho datetime.now() của máy.
+        """
+        return datetime.datetime.now(self.zone).replace(tzinfo=None)
+
+    def to_local(self, value: datetime.datetime) -> datetime.datetime:
+        """
+        datetime có tz -> datetime naive theo giờ local của bảng.
+        """
+        minute, rest = divmod(value - UTC_EPOCH, ONE_MINUTE)
+        return from_minutes(self.utc_to_local(minute)) + rest
+
+    def attach(self, value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+        """
+        datetime naive (giờ local) -> datetime có offset cố định đúng với thời điểm đó, để xuất ra ngoài.
+        """
+        if value is None or value.tzinfo is not None:
+            return value
+        minute = to_minutes(value)
+        offset = minute - self.local_to_utc(minute)
+        tz = self.fixed_zones.get(offset)
+        if tz is None:
+            tz = self.fixed_zones[offset] = datetime.timezone(datetime.timedelta(minutes=offset))
+        return value.replace(tzinfo=tz)
+
+    def iter_gaps(self, start: datetime.datetime, end: datetime.datetime) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+        """
+        Các khoảng giờ local không tồn tại (chuyển sang giờ mùa hè) giao với [start, end) local.
+        """
+        local_start, local_end = to_minutes(start), to_minutes(end)
+        self.offset_at_utc(local_start - MINUTES_PER_DAY)
+        self.offset_at_utc(local_end + MINUTES_PER_DAY)
+        idx = max(1, bisect_right(self.starts, local_start - MINUTES_PER_DAY))
+        while idx < len(self.starts):
+            transition = self.starts[idx]
+            before, after = self.offsets[idx - 1], self.offsets[idx]
+            gap_start, gap_end = transition + before, transition + after
+            if gap_start >= local_end:
+                return
+            if after > before and gap_end > local_start:
+                yield from_minutes(max(gap_start, local_start)), from_minutes(min(gap_end, local_end))
+            idx += 1
+
+
+def to_local_naive(value: Optional[datetime.datetime], table: Optional[TimeZoneTable] = None) -> Optional[datetime.datetime]:
+    """
+    Đưa datetime về dạng naive mà scheduler dùng: theo múi giờ của `table`, hoặc giờ hệ thống nếu không có.
+    Naive values are returned unchanged (already local wall-clock time).
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    if table is None:
+        return value.astimezone().replace(tzinfo=None)
+    return table.to_local(value)
+
+def localize_task_times(task, table: Optional[TimeZoneTable] = None):
+    """
+    Đổi due_date / scheduled_start / scheduled_end có tz của task về giờ local naive (theo `table`).
+    """
+    for field in ("due_date", "scheduled_start", "scheduled_end"):
+        value = getattr(task, field)
+        if value is not None and value.tzinfo is not None:
+            setattr(task, field, to_local_naive(value, table))
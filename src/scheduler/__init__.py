@@ -1,4 +1,66 @@
-from .AIscheduler import *
-from .CalendarManager import *
-from .scheduler123 import *
-from .SlotScorer import *
+"""
+Các engine lên lịch. Tên public được import lazily từ module tương ứng ở lần dùng đầu tiên
+(PEP 562), nên `import src.scheduler` gần như không tốn gì và chỉ engine thực sự được dùng
+mới bị import. `src.scheduler.scheduler123` (bản cũ) vẫn truy cập được như một module.
+"""
+import importlib
+import sys
+import types
+
+_EXPORTS = {
+    "AIScheduler": ("AIScheduler",),
+    "BatchScheduler": ("BatchScheduler", "UserResult"),
+    "BusyIndex": ("BusyIndex", "EPOCH", "ONE_MINUTE", "to_minutes", "from_minutes"),
+    "CapacityIndex": ("CapacityIndex", "CapacityReport", "DeadlineLoad"),
+    "CalendarManager": ("CalendarManager",),
+    "DayProfile": ("DayProfile", "SharedTables", "SlotTemplateCache", "settings_key"),
+    "DecisionLog": ("DecisionLog", "FACTOR_NAMES", "OFFER", "FEEDBACK", "ACCEPTED", "MOVED", "factor_vector"),
+    "DependencyGraph": ("DependencyGraph", "DependencyCycleError"),
+    "EventSink": ("EventSink", "CountingSink", "JsonLinesSink", "ConsoleSink", "DEBUG", "INFO", "WARNING", "OFF",
+                  "LEVEL_NAMES", "PLACED", "UNPLACEABLE", "NO_SUITABLE_SLOT", "BLOCKED", "LATE",
+                  "EVENT_LEVELS"),
+    "GroupAvailability": ("GroupAvailability",),
+    "RecurrenceExpander": ("RecurrenceExpander",),
+    "ScheduleCache": ("ScheduleCache", "task_fingerprint", "pending_tasks_for", "apply_placements"),
+    "ScheduleValidator": ("ScheduleValidator", "ValidationReport", "ConflictGroup",
+                          "MISSING_START", "MISSING_END", "END_BEFORE_START"),
+    "SchedulerStats": ("SchedulerStats",),
+    "ScoringPlan": ("ScoringPlan", "ScoringFactor", "FACTORS", "BUILTIN_FACTORS", "TASK_ONLY", "SLOT_ONLY", "PAIR",
+                    "register_factor", "unregister_factor", "default_weights"),
+    "ScoringWeights": ("ScoringWeights", "WEIGHTS_FILE_VERSION"),
+    "SlotScorer": ("SlotScorer", "SlotScore", "DEFAULT_WEIGHTS"),
+    "StreamingScheduler": ("StreamingScheduler", "SpillFile", "SCHEDULED", "FIXED", "UNPLACED"),
+    "TimeZoneTable": ("TimeZoneTable", "to_local_naive", "localize_task_times", "year_transitions"),
+    "src.models": ("Task", "TimeSlot", "Priority"),
+}
+
+# tên -> module chứa nó
+_ORIGINS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_ORIGINS)
+
+
+def __getattr__(name):
+    module_name = _ORIGINS.get(name)
+    if module_name is None:
+        if name == "scheduler123":
+            return importlib.import_module("." + name, __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name if "." in module_name else "." + module_name, __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_ORIGINS))
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Lần đầu một submodule được import, importlib gán package.<tên module> = module. Các module
+        # ở đây đặt tên theo class (AIScheduler.py, ...) nên giữ tên đó trỏ tới class như trước.
+        if isinstance(value, types.ModuleType) and _ORIGINS.get(name) == name:
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _Package
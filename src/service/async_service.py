@@ -0,0 +1,215 @@
+"""
+asyncio front end for SchedulerRegistry with per-user request coalescing.
+
+Mutations and schedule requests for a user that arrive within `window_seconds`
+of each other are applied as one batch: all mutations in arrival order, then a
+single schedule pass per distinct (date, days) whose result is shared by every
+waiter. The CPU-bound pass runs in an executor so the event loop stays responsive.
+
+    python -m src.service.async_service --port 8766
+
+serves newline-delimited JSON-RPC 2.0 over TCP on localhost.
+"""
+import argparse
+import asyncio
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from src.service.daemon import (SchedulerRegistry, RpcError, rpc_error, INTERNAL_ERROR,
+                                INVALID_REQUEST, PARSE_ERROR)
+from src.utils.parser import add_settings_arguments, settings_from_args
+
+ScheduleKey = Tuple[Optional[str], int]
+
+
+class UserBatch:
+    def __init__(self):
+        self.mutations: List[Tuple[str, Dict, asyncio.Future]] = []
+        self.schedules: Dict[ScheduleKey, asyncio.Future] = {}
+        self.requests = 0
+
+
+class AsyncSchedulingService:
+    """
+    Hàng đợi theo user, gom các request gần nhau thành một lần chạy schedule_tasks.
+    Batches for the same user are applied strictly in order; different users proceed in parallel
+    up to the executor's worker count.
+    """
+    MUTATIONS = ("add_tasks", "remove_task", "set_settings")
+
+    def __init__(self, registry: Optional[SchedulerRegistry] = None, window_seconds: float = 0.01,
+                 executor: Optional[Executor] = None):
+        self.registry = registry if registry is not None else SchedulerRegistry()
+        self.window_seconds = window_seconds
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=4)
+        self.batches: Dict[str, UserBatch] = {}
+        self.user_locks: Dict[str, asyncio.Lock] = {}
+        self.flush_tasks = set()
+        self.stats = {"requests": 0, "mutations": 0, "schedule_passes": 0, "batches": 0}
+
+    def current_batch(self, user: str) -> UserBatch:
+        batch = self.batches.get(user)
+        if batch is None:
+            batch = self.batches[user] = UserBatch()
+            asyncio.get_running_loop().call_later(self.window_seconds, self.start_flush, user, batch)
+        return batch
+
+    def start_flush(self, user: str, batch: UserBatch):
+        task = asyncio.ensure_future(self.flush(user, batch))
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+
+    async def mutate(self, method: str, user: str, **params):
+        if method not in self.MUTATIONS:
+            raise RpcError(INVALID_REQUEST, f"Not a mutation: {method}")
+        future = asyncio.get_running_loop().create_future()
+        batch = self.current_batch(user)
+        batch.mutations.append((method, params, future))
+        batch.requests += 1
+        self.stats["requests"] += 1
+        return await future
+
+    async def add_tasks(self, user: str, tasks: Optional[List[Dict]] = None, lines: Optional[List[str]] = None):
+        return await self.mutate("add_tasks", user, tasks=tasks, lines=lines)
+
+    async def remove_task(self, user: str, task_id: int):
+        return await self.mutate("remove_task", user, task_id=task_id)
+
+    async def set_settings(self, user: str, settings: Dict):
+        return await self.mutate("set_settings", user, settings=settings)
+
+    async def schedule(self, user: str, date: Optional[str] = None, days: int = 1) -> Dict:
+        batch = self.current_batch(user)
+        key = (date, days)
+        future = batch.schedules.get(key)
+        if future is None:
+            future = batch.schedules[key] = asyncio.get_running_loop().create_future()
+        batch.requests += 1
+        self.stats["requests"] += 1
+        # shield: một waiter bị cancel không được hủy kết quả dùng chung
+        return await asyncio.shield(future)
+
+    async def flush(self, user: str, batch: UserBatch):
+        if self.batches.get(user) is batch:
+            del self.batches[user]
+        lock = self.user_locks.setdefault(user, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            outcomes, mutations, passes = await loop.run_in_executor(self.executor, self.apply_batch, user, batch)
+        # Bộ đếm chỉ được cập nhật trên event loop (executor chạy nhiều user song song)
+        self.stats["batches"] += 1
+        self.stats["mutations"] += mutations
+        self.stats["schedule_passes"] += passes
+        for future, ok, value in outcomes:
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def apply_batch(self, user: str, batch: UserBatch):
+        """
+        Chạy trong executor: áp dụng mutation theo thứ tự rồi một lần schedule cho mỗi key.
+        Returns (outcomes, successful mutations, successful schedule passes).
+        """
+        outcomes = []
+        mutations = passes = 0
+        for method, params, future in batch.mutations:
+            try:
+                outcomes.append((future, True, getattr(self.registry, method)(user=user, **params)))
+                mutations += 1
+            except Exception as exc:
+                outcomes.append((future, False, exc))
+        for (date, days), future in batch.schedules.items():
+            try:
+                outcomes.append((future, True, self.registry.schedule(user=user, date=date, days=days)))
+                passes += 1
+            except Exception as exc:
+                outcomes.append((future, False, exc))
+        return outcomes, mutations, passes
+
+    async def call(self, method: str, params: Dict):
+        """
+        Dispatch một JSON-RPC method: mutation/schedule đi qua hàng đợi, còn lại chạy trong executor.
+        """
+        if method in self.MUTATIONS:
+            return await self.mutate(method, **params)
+        if method == "schedule":
+            return await self.schedule(**params)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.registry.dispatch, {"method": method, "params": params})
+
+    async def handle_request(self, request) -> Dict:
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RpcError(INVALID_REQUEST, "Invalid request")
+            params = request.get("params") or {}
+            try:
+                result = await self.call(request["method"], params)
+            except (TypeError, ValueError, KeyError) as exc:
+                raise RpcError(-32602, str(exc))
+        except RpcError as exc:
+            return rpc_error(request_id, exc.code, exc.message)
+        except Exception as exc:
+            return rpc_error(request_id, INTERNAL_ERROR, str(exc))
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def respond(line: bytes):
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = rpc_error(None, PARSE_ERROR, "Parse error")
+            else:
+                response = await self.handle_request(request)
+            writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    # Mỗi request là một task riêng để các request pipeline được gom chung batch
+                    task = asyncio.ensure_future(respond(line))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def start_server(self, host: str = "127.0.0.1", port: int = 8766):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+def main(raw_args=None):
+    parser = argparse.ArgumentParser(description="asyncio scheduling service (JSON-RPC lines over TCP)")
+    add_settings_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--window_ms", type=float, default=10.0)
+    args = parser.parse_args(raw_args)
+    service = AsyncSchedulingService(SchedulerRegistry(settings_from_args(args)),
+                                     window_seconds=args.window_ms / 1000)
+
+    async def run():
+        server = await service.start_server(args.host, args.port)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Local scheduling daemon: JSON-RPC 2.0 over HTTP, stdlib only.
+
+Keeps one warm AIScheduler per user so each request only pays for the work it
+asks for. Start it with
+
+    python -m src.service.daemon --host 127.0.0.1 --port 8765
+
+and POST {"jsonrpc": "2.0", "id": 1, "method": "schedule", "params": {"user": "u1", "date": "2025-09-15"}}
+to http://127.0.0.1:8765/rpc.
+"""
+import argparse
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from src.scheduler.AIScheduler import AIScheduler
+from src.scheduler.ScheduleCache import ScheduleCache
+from src.scheduler.TimeZoneTable import to_local_naive
+from src.utils.output import task_to_record
+from src.utils.parser import add_settings_arguments, parse_task_line, settings_from_args, task_from_dict
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def parse_day(value: Optional[str], scheduler: AIScheduler) -> datetime.datetime:
+    """
+    Ngày (00:00, giờ local naive của user) từ tham số `date`; mặc định là hôm nay theo múi giờ của user.
+    """
+    day = datetime.datetime.fromisoformat(value) if value else scheduler.now()
+    if day.tzinfo is not None:
+        day = to_local_naive(day, scheduler.timezone)
+    return day.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class UserState:
+    def __init__(self, settings: Optional[Dict] = None, result_cache: Optional[ScheduleCache] = None):
+        self.scheduler = AIScheduler(settings=settings, result_cache=result_cache)
+        self.lock = threading.Lock()
+
+
+class SchedulerRegistry:
+    """
+    Scheduler "ấm" theo từng user, giữ trong bộ nhớ giữa các request.
+    Each user has its own lock, so requests for different users run in parallel.
+    """
+    def __init__(self, default_settings: Optional[Dict] = None, result_cache: Optional[ScheduleCache] = None):
+        self.default_settings = default_settings
+        # Cache khóa theo nội dung nên dùng chung được giữa các user
+        self.result_cache = result_cache
+        self.users: Dict[str, UserState] = {}
+        self.lock = threading.Lock()
+
+    def get(self, user: str, create: bool = True) -> UserState:
+        state = self.users.get(user)
+        if state is None:
+            if not create:
+                raise RpcError(INVALID_PARAMS, f"Unknown user: {user}")
+            with self.lock:
+                state = self.users.get(user)
+                if state is None:
+                    settings = self.user_settings(user, self.default_settings) if self.default_settings else None
+                    state = self.users[user] = UserState(settings, self.result_cache)
+        return state
+
+    def user_settings(self, user: str, settings: Dict) -> Dict:
+        settings = dict(settings)
+        if settings.get("weights_file") and not settings.get("weights_user"):
+            settings["weights_user"] = user # Trọng số đã học theo từng user
+        return settings
+
+    # --- RPC methods ---
+
+    def ping(self) -> str:
+        return "pong"
+
+    def set_settings(self, user: str, settings: Dict) -> Dict:
+        """
+        Thay settings của user; task, instance lặp lại đã lên lịch và cấu hình khác của scheduler được giữ lại.
+        """
+        state = self.get(user)
+        with state.lock:
+            state.scheduler.update_settings(self.user_settings(user, settings))
+            return {"tasks": len(state.scheduler.tasks) + len(state.scheduler.recurrence)}
+
+    def add_tasks(self, user: str, tasks: Optional[List[Dict]] = None, lines: Optional[List[str]] = None) -> Dict:
+        parsed = [task_from_dict(item) for item in tasks or []]
+        for line in lines or []:
+            task = parse_task_line(line)
+            if task is None:
+                raise RpcError(INVALID_PARAMS, f"Invalid task line: {line!r}")
+            parsed.append(task)
+        state = self.get(user)
+        with state.lock:
+            for task in parsed:
+                state.scheduler.remove_task(task.id)
+                state.scheduler.add_task(task)
+        return {"added": len(parsed)}
+
+    def remove_task(self, user: str, task_id: int) -> Dict:
+        state = self.get(user, create=False)
+        with state.lock:
+            removed = state.scheduler.remove_task(int(task_id))
+        return {"removed": removed}
+
+    def schedule(self, user: str, date: Optional[str] = None, days: int = 1) -> Dict:
+        state = self.get(user, create=False)
+        start = parse_day(date, state.scheduler)
+        with state.lock:
+            for offset in range(max(1, days)):
+                state.scheduler.schedule_tasks(target_date=start + datetime.timedelta(days=offset))
+            end = start + datetime.timedelta(days=max(1, days))
+            placed = [task_to_record(task) for task in state.scheduler.iter_scheduled_between(start, end)]
+            pending = sum(1 for task in state.scheduler.tasks if task.scheduled_start is None)
+        return {"scheduled": placed, "pending": pending}
+
+    def query(self, user: str, date: Optional[str] = None) -> List[Dict]:
+        state = self.get(user, create=False)
+        with state.lock:
+            return [task_to_record(task) for task in state.scheduler.get_schedule_for_date(parse_day(date, state.scheduler))]
+
+    def list_tasks(self, user: str) -> List[Dict]:
+        state = self.get(user, create=False)
+        with state.lock:
+            return [task_to_record(task) for task in state.scheduler.iter_all_tasks()]
+
+    def cache_stats(self) -> Optional[Dict]:
+        return self.result_cache.get_stats() if self.result_cache is not None else None
+
+    def drop_user(self, user: str) -> Dict:
+        with self.lock:
+            return {"dropped": self.users.pop(user, None) is not None}
+
+    METHODS = ("ping", "set_settings", "add_tasks", "remove_task", "schedule", "query", "list_tasks", "cache_stats", "drop_user")
+
+    def dispatch(self, request: Dict) -> Dict:
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            raise RpcError(INVALID_REQUEST, "Invalid request")
+        method = request["method"]
+        if method not in self.METHODS:
+            raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            raise RpcError(INVALID_PARAMS, "params must be an object")
+        try:
+            return getattr(self, method)(**params)
+        except (TypeError, ValueError, KeyError) as exc:
+            raise RpcError(INVALID_PARAMS, str(exc))
+
+
+class RpcRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/rpc":
+            self.send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self.send_json(200, rpc_error(None, PARSE_ERROR, "Parse error"))
+            return
+        if isinstance(request, list):
+            self.send_json(200, [self.handle_one(item) for item in request])
+        else:
+            self.send_json(200, self.handle_one(request))
+
+    def handle_one(self, request) -> Dict:
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            result = self.server.registry.dispatch(request)
+        except RpcError as exc:
+            return rpc_error(request_id, exc.code, exc.message)
+        except Exception as exc:
+            return rpc_error(request_id, INTERNAL_ERROR, str(exc))
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def send_json(self, status: int, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Không log từng request ra stderr
+        pass
+
+
+def rpc_error(request_id, code: int, message: str) -> Dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class SchedulerDaemon:
+    """
+    HTTP server bọc SchedulerRegistry. Port 0 picks a free port; see `address`.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, default_settings: Optional[Dict] = None):
+        self.registry = SchedulerRegistry(default_settings)
+        self.server = ThreadingHTTPServer((host, port), RpcRequestHandler)
+        self.server.daemon_threads = True
+        self.server.registry = self.registry
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    @property
+    def url(self) -> str:
+        host, port = self.address[:2]
+        return f"http://{host}:{port}/rpc"
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self) -> "SchedulerDaemon":
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def main(raw_args=None):
+    parser = argparse.ArgumentParser(description="Local scheduling daemon (JSON-RPC over HTTP)")
+    add_settings_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache_entries", type=int, default=0, help="Size of the shared result cache (0 = off)")
+    args = parser.parse_args(raw_args)
+    daemon = SchedulerDaemon(args.host, args.port, default_settings=settings_from_args(args))
+    if args.cache_entries > 0:
+        daemon.registry.result_cache = ScheduleCache(max_entries=args.cache_entries)
+    print(f"Listening on {daemon.url}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server.server_close()
+
+if __name__ == "__main__":
+    main()
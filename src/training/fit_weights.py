@@ -0,0 +1,214 @@
+"""
+Offline training of SlotScorer weights from decision logs.
+
+Reads the JSON-lines logs written by DecisionLog, turns every labelled decision
+(offered slot accepted, or moved to another slot) into a choice among its
+candidate factor vectors and fits a conditional-logit ranking model with
+vectorized Newton steps over the whole history. A global model is fitted
+first; each user with enough decisions is then fitted with an L2 pull towards
+the global weights. Requires NumPy. Usage:
+
+    python -m src.training.fit_weights decisions.jsonl --output weights.json
+"""
+import argparse
+import itertools
+import json
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.scheduler.DecisionLog import FACTOR_NAMES, OFFER, FEEDBACK, ACCEPTED, MOVED
+from src.scheduler.ScoringWeights import ScoringWeights
+from src.scheduler.SlotScorer import DEFAULT_WEIGHTS
+
+GLOBAL_USER = None
+
+
+class ChoiceData:
+    """
+    Các lựa chọn của một user, lưu phẳng: ma trận candidate (n_rows x n_factors) trong một
+    array('d'), `offsets[g]` là hàng đầu tiên của quyết định g, `chosen[g]` là hàng được chọn.
+    """
+    def __init__(self):
+        self.values = array('d')
+        self.offsets = array('q', [0])
+        self.chosen = array('q')
+
+    def __len__(self) -> int:
+        return len(self.chosen)
+
+    def add(self, candidates: List[List[float]], chosen: int):
+        # Quyết định chỉ có một ứng viên không mang thông tin gì cho mô hình
+        if len(candidates) < 2:
+            return
+        for vector in candidates:
+            self.values.extend(vector)
+        self.chosen.append(self.offsets[-1] + chosen)
+        self.offsets.append(self.offsets[-1] + len(candidates))
+
+    def extend(self, other: "ChoiceData"):
+        base = self.offsets[-1]
+        self.values.extend(other.values)
+        self.chosen.extend(row + base for row in other.chosen)
+        self.offsets.extend(offset + base for offset in other.offsets[1:])
+
+
+def remap(vector: List[float], columns: Optional[List[int]]) -> List[float]:
+    if columns is None:
+        return vector
+    return [vector[index] if index >= 0 else 0.0 for index in columns]
+
+def read_decisions(lines: Iterable[str], implicit_accept: bool = False) -> Dict[Optional[str], ChoiceData]:
+    """
+    Ghép các dòng offer với feedback (theo user + task id, offer mới nhất thắng) thành ChoiceData theo user.
+    Offers without feedback are skipped unless `implicit_accept`, which counts them as accepted.
+    """
+    data: Dict[Optional[str], ChoiceData] = {}
+    offers: Dict[Tuple[Optional[str], int], Tuple[List[List[float]], int]] = {}
+    columns: Optional[List[int]] = None
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record.get("type")
+        if kind == "header":
+            names = record.get("factors", [])
+            columns = None if tuple(names) == FACTOR_NAMES else [
+                names.index(name) if name in names else -1 for name in FACTOR_NAMES]
+        elif kind == OFFER:
+            candidates = [remap(vector, columns) for vector in record["candidates"]]
+            offers[(record.get("user"), record["task"])] = (candidates, record["offered"])
+        elif kind == FEEDBACK:
+            key = (record.get("user"), record["task"])
+            offer = offers.pop(key, None)
+            if offer is None:
+                continue
+            candidates, chosen = offer
+            if record.get("outcome") == MOVED and record.get("factors"):
+                moved = remap(record["factors"], columns)
+                if moved in candidates:
+                    chosen = candidates.index(moved)
+                else:
+                    candidates.append(moved)
+                    chosen = len(candidates) - 1
+            elif record.get("outcome") != ACCEPTED:
+                continue
+            data.setdefault(key[0], ChoiceData()).add(candidates, chosen)
+    if implicit_accept:
+        for (user, _), (candidates, chosen) in offers.items():
+            data.setdefault(user, ChoiceData()).add(candidates, chosen)
+    return data
+
+
+def fit_conditional_logit(choices: ChoiceData, prior, l2: float = 1.0, iterations: int = 50, tol: float = 1e-6):
+    """
+    Cực đại log-likelihood của mô hình conditional logit P(chọn c) ∝ exp(beta·x_c) với phạt
+    l2/2·|beta - prior|². All decisions are evaluated at once: per-decision softmax uses
+    reduceat over the flat candidate matrix, and Newton steps solve an n_factors² system.
+    """
+    import numpy as np
+
+    n_factors = len(FACTOR_NAMES)
+    # Lưu theo cột (n_factors x n_rows): các phép nhân/reduce chạy trên dãy liên tục, nhanh gấp ~2 lần
+    X = np.ascontiguousarray(np.frombuffer(choices.values, dtype=np.float64).reshape(-1, n_factors).T)
+    offsets = np.frombuffer(choices.offsets, dtype=np.int64)
+    starts = offsets[:-1]
+    group = np.repeat(np.arange(len(starts)), np.diff(offsets))
+    chosen_sum = X[:, np.frombuffer(choices.chosen, dtype=np.int64)].sum(axis=1)
+    prior = np.asarray(prior, dtype=np.float64)
+    identity = np.eye(n_factors)
+
+    def objective(beta):
+        u = beta @ X
+        u_max = np.maximum.reduceat(u, starts)
+        e = np.exp(u - u_max[group])
+        z = np.add.reduceat(e, starts)
+        value = chosen_sum @ beta - (u_max + np.log(z)).sum() - 0.5 * l2 * np.sum((beta - prior) ** 2)
+        return value, e / z[group]
+
+    beta = prior.copy()
+    value, p = objective(beta)
+    for _ in range(iterations):
+        weighted = X * p
+        expected = np.add.reduceat(weighted, starts, axis=1)
+        grad = chosen_sum - expected.sum(axis=1) - l2 * (beta - prior)
+        hessian = weighted @ X.T - expected @ expected.T + l2 * identity
+        step = np.linalg.solve(hessian, grad)
+        # Backtracking: Newton có thể vượt quá khi dữ liệu gần như tách được
+        scale = 1.0
+        while scale > 1e-4:
+            candidate = beta + scale * step
+            new_value, new_p = objective(candidate)
+            if new_value >= value:
+                break
+            scale *= 0.5
+        else:
+            break
+        beta, value, p = candidate, new_value, new_p
+        if np.abs(scale * step).max() < tol:
+            break
+    return beta, value
+
+
+def to_weights(beta, prior_weights: Dict[str, float]) -> Dict[str, float]:
+    """
+    Đổi beta sang trọng số cho SlotScorer: cắt về >= 0 (điểm slot âm sẽ không bao giờ được chọn)
+    và chuẩn hóa về cùng tổng với DEFAULT_WEIGHTS, vì SlotScorer chia cho tổng trọng số.
+    """
+    clipped = [max(0.0, float(value)) for value in beta]
+    total = sum(clipped)
+    if total <= 0:
+        return dict(prior_weights)
+    scale = sum(DEFAULT_WEIGHTS.values()) / total
+    return {name: round(value * scale, 6) for name, value in zip(FACTOR_NAMES, clipped)}
+
+def fit_weights(data: Dict[Optional[str], ChoiceData], l2: float = 1.0, min_decisions: int = 50) -> ScoringWeights:
+    try:
+        import numpy  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("fit_weights requires NumPy (pip install numpy)") from exc
+
+    default_vector = [DEFAULT_WEIGHTS[name] for name in FACTOR_NAMES]
+    everything = ChoiceData()
+    for choices in data.values():
+        everything.extend(choices)
+    meta = {"decisions": len(everything), "l2": l2, "users": {}}
+    if not len(everything):
+        return ScoringWeights(default=dict(DEFAULT_WEIGHTS), meta=meta)
+
+    global_beta, _ = fit_conditional_logit(everything, default_vector, l2=l2)
+    weights = ScoringWeights(default=to_weights(global_beta, DEFAULT_WEIGHTS), meta=meta)
+    for user, choices in data.items():
+        if user is GLOBAL_USER or len(choices) < min_decisions:
+            continue
+        # Co về mô hình chung: user ít dữ liệu sẽ gần với trọng số chung
+        beta, _ = fit_conditional_logit(choices, global_beta, l2=l2)
+        weights.users[user] = to_weights(beta, weights.default)
+        meta["users"][user] = len(choices)
+    return weights
+
+
+def main(raw_args=None) -> int:
+    parser = argparse.ArgumentParser(description="Fit SlotScorer weights from decision logs")
+    parser.add_argument("logs", nargs="+", help="DecisionLog JSON-lines files")
+    parser.add_argument("--output", required=True, help="Weights file to write (load with --weights_file)")
+    parser.add_argument("--l2", type=float, default=1.0, help="Pull towards the default/global weights")
+    parser.add_argument("--min_decisions", type=int, default=50, help="Minimum labelled decisions for per-user weights")
+    parser.add_argument("--implicit_accept", action="store_true", help="Count offers without feedback as accepted")
+    args = parser.parse_args(raw_args)
+
+    # Đọc nối tiếp các file để feedback ở file sau vẫn ghép được với offer ở file trước
+    streams = [open(path, "r", encoding="utf-8") for path in args.logs]
+    try:
+        data = read_decisions(itertools.chain.from_iterable(streams), implicit_accept=args.implicit_accept)
+    finally:
+        for stream in streams:
+            stream.close()
+    weights = fit_weights(data, l2=args.l2, min_decisions=args.min_decisions)
+    weights.save(args.output)
+    print(f"{weights.meta['decisions']} decisions, {len(weights.users)} per-user weight sets -> {args.output}",
+          file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
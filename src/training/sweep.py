@@ -0,0 +1,250 @@
+"""
+What-if sweep over scheduler settings and scoring weights.
+
+Parses the task file and busy calendars once, then schedules the same input
+under every combination of the given settings values and weight variants,
+fanning the variants out over worker processes. Each worker receives the
+parsed input once (pool initializer) and keeps its own slot templates and day
+profiles across the variants it runs. Reports placement rate, the variant's
+own score total and a reference score (every placement rescored with the base
+settings and default weights, so totals are comparable across variants). Usage:
+
+    python -m src.training.sweep --tasks tasks.txt --date 2025-09-15 --days 5 \\
+        --work_start_hour 8 9 --work_end_hour 17 18 --min_buffer_minutes 10 15 \\
+        --weights default weights.json '{"deadline_proximity": 5}'
+"""
+import argparse
+import copy
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.models import Task, TimeSlot
+from src.scheduler.AIScheduler import AIScheduler
+from src.scheduler.BusyIndex import BusyIndex
+from src.scheduler.DayProfile import SharedTables
+from src.scheduler.EventSink import EventSink, INFO, PLACED
+from src.scheduler.ScoringWeights import ScoringWeights
+from src.scheduler.SlotScorer import SlotScorer, DEFAULT_WEIGHTS
+from src.utils.ical import import_ics_busy
+from src.utils.parser import iter_tasks
+
+# Các settings có thể quét (slot_duration_minutes không có ở đây: CalendarManager luôn sinh slot 60 phút)
+SWEEP_AXES = ("work_start_hour", "work_end_hour", "min_buffer_minutes")
+
+DEFAULT_SETTINGS = {
+    "work_start_hour": 9,
+    "work_end_hour": 17,
+    "min_buffer_minutes": 15,
+    "slot_duration_minutes": 30,
+    "group_by_project": True,
+}
+
+
+class SweepInput:
+    """
+    Input dùng chung cho mọi biến thể: task đã parse và lịch bận đã gộp sẵn.
+    Tasks are copied before each run (scheduling mutates them); the BusyIndex is shared read-only.
+    """
+    def __init__(self, tasks: List[Task], start_date: datetime.datetime, days: int = 1,
+                 busy_index: Optional[BusyIndex] = None, reference_settings: Optional[Dict] = None):
+        self.tasks = tasks
+        self.start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days = max(1, days)
+        self.busy_index = busy_index if busy_index is not None else BusyIndex()
+        self.reference_settings = dict(reference_settings or DEFAULT_SETTINGS)
+
+    @property
+    def end_date(self) -> datetime.datetime:
+        return self.start_date + datetime.timedelta(days=self.days)
+
+    # Cùng API với CalendarManager để import_ics_busy ghi thẳng vào index
+    def add_busy_block(self, start: datetime.datetime, end: datetime.datetime):
+        self.busy_index.add(start, end)
+
+    def add_busy_blocks(self, blocks: Iterable[Tuple[datetime.datetime, datetime.datetime]]):
+        self.busy_index.add_many(blocks)
+
+
+class SweepVariant:
+    def __init__(self, name: str, settings: Dict, weights_name: str = "default"):
+        self.name = name
+        self.settings = settings
+        self.weights_name = weights_name
+
+    def __repr__(self) -> str:
+        return f"SweepVariant({self.name})"
+
+
+class VariantResult:
+    def __init__(self, variant: SweepVariant, placed: int, unplaced: int, score_total: float,
+                 reference_score: float, seconds: float):
+        self.variant = variant
+        self.placed = placed
+        self.unplaced = unplaced
+        self.score_total = score_total
+        self.reference_score = reference_score
+        self.seconds = seconds
+
+    @property
+    def placement_rate(self) -> float:
+        total = self.placed + self.unplaced
+        return self.placed / total if total else 0.0
+
+    def as_dict(self) -> Dict:
+        settings = {key: self.variant.settings.get(key) for key in SWEEP_AXES}
+        return {"variant": self.variant.name, "weights": self.variant.weights_name, **settings,
+                "placed": self.placed, "unplaced": self.unplaced,
+                "placement_rate": round(self.placement_rate, 4), "score_total": round(self.score_total, 4),
+                "reference_score": round(self.reference_score, 4), "seconds": round(self.seconds, 4)}
+
+
+class PlacementSink(EventSink):
+    """
+    Chỉ giữ các task được xếp và tổng điểm của chúng (điểm theo scorer của biến thể).
+    """
+    def __init__(self):
+        super().__init__(INFO)
+        self.placed: List[Task] = []
+        self.score_total = 0.0
+
+    def emit(self, event: str, task: Task, **fields):
+        if event == PLACED:
+            self.placed.append(task)
+            self.score_total += fields.get("score", 0.0)
+
+
+def load_weight_variant(spec: str, weights_user: Optional[str] = None) -> Tuple[str, Optional[Dict[str, float]]]:
+    """
+    "default", một file trọng số (ScoringWeights), hoặc JSON ghi đè trên DEFAULT_WEIGHTS.
+    """
+    if spec == "default":
+        return spec, None
+    if spec.lstrip().startswith("{"):
+        overrides = json.loads(spec)
+        unknown = set(overrides) - set(DEFAULT_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Unknown scoring factors: {', '.join(sorted(unknown))}")
+        return spec.replace(" ", ""), dict(DEFAULT_WEIGHTS, **overrides)
+    return os.path.basename(spec), ScoringWeights.load(spec).for_user(weights_user, DEFAULT_WEIGHTS)
+
+def build_variants(base_settings: Dict, axes: Dict[str, List], weight_variants: List[Tuple[str, Optional[Dict]]]) -> List[SweepVariant]:
+    """
+    Tích Descartes của các giá trị settings và các bộ trọng số; bỏ các tổ hợp giờ làm việc rỗng.
+    """
+    names = [name for name in SWEEP_AXES if axes.get(name)]
+    variants = []
+    for values in itertools.product(*(axes[name] for name in names)):
+        settings = dict(base_settings)
+        settings.update(zip(names, values))
+        if settings.get("work_start_hour", 9) >= settings.get("work_end_hour", 17):
+            continue
+        label = ",".join(f"{name}={value}" for name, value in zip(names, values))
+        for weights_name, weights in weight_variants or [("default", None)]:
+            variant_settings = dict(settings)
+            if weights is not None:
+                variant_settings["weights"] = weights
+            name = f"{label};weights={weights_name}" if label else f"weights={weights_name}"
+            variants.append(SweepVariant(name, variant_settings, weights_name))
+    return variants
+
+
+# --- Workers ---
+
+_worker_input: Optional[SweepInput] = None
+_worker_tables: Optional[SharedTables] = None
+
+def init_worker(sweep_input: SweepInput):
+    global _worker_input, _worker_tables
+    _worker_input = sweep_input
+    _worker_tables = SharedTables()
+
+def run_variant(variant: SweepVariant) -> VariantResult:
+    sweep_input = _worker_input
+    started = time.perf_counter()
+    sink = PlacementSink()
+    scheduler = AIScheduler(settings=dict(variant.settings), event_sink=sink, shared_tables=_worker_tables)
+    scheduler.calendar_manager.busy_index = sweep_input.busy_index
+    for task in sweep_input.tasks:
+        scheduler.add_task(copy.copy(task))
+    for offset in range(sweep_input.days):
+        scheduler.schedule_tasks(target_date=sweep_input.start_date + datetime.timedelta(days=offset))
+    unplaced = sum(1 for task in scheduler.iter_all_tasks() if task.scheduled_start is None)
+    seconds = time.perf_counter() - started
+
+    reference = SlotScorer(sweep_input.reference_settings)
+    reference_score = sum(reference.score_slot(TimeSlot(task.scheduled_start, task.scheduled_end), task).total
+                          for task in sink.placed)
+    return VariantResult(variant, len(sink.placed), unplaced, sink.score_total, reference_score, seconds)
+
+def run_sweep(sweep_input: SweepInput, variants: List[SweepVariant], processes: Optional[int] = None) -> List[VariantResult]:
+    """
+    Chạy mọi biến thể, song song trên `processes` tiến trình (mặc định: số core). Results keep
+    the order of `variants`. processes=1 runs in this process, which is also used for one variant.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(variants)))
+    if processes == 1:
+        init_worker(sweep_input)
+        return [run_variant(variant) for variant in variants]
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(sweep_input,)) as pool:
+        return pool.map(run_variant, variants, chunksize=1)
+
+def format_report(results: List[VariantResult]) -> str:
+    ranked = sorted(results, key=lambda r: (-r.placement_rate, -r.reference_score))
+    lines = ["rank  placed  rate     score_total  reference  seconds  variant"]
+    for rank, r in enumerate(ranked, 1):
+        lines.append(f"{rank:<5} {r.placed:>6} {r.placement_rate:>7.1%} {r.score_total:>12.3f} "
+                     f"{r.reference_score:>10.3f} {r.seconds:>8.3f}  {r.variant.name}")
+    return "\n".join(lines)
+
+
+def main(raw_args=None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate a grid of scheduler settings and weights on one task set")
+    parser.add_argument("--tasks", required=True, help="Task file, or '-' for stdin")
+    parser.add_argument("--date", default=None, help="First day (YYYY-MM-DD), default today")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--busy", action="append", default=[], help="iCalendar file of busy time (repeatable)")
+    for name in SWEEP_AXES:
+        parser.add_argument(f"--{name}", type=int, nargs="+", default=None)
+    parser.add_argument("--weights", nargs="+", default=["default"],
+                        help="'default', a weights file, or JSON overrides such as '{\"deadline_proximity\": 5}'")
+    parser.add_argument("--weights_user", default=None, help="User to take from weights files")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--format", dest="output_format", choices=["table", "jsonl"], default="table")
+    args = parser.parse_args(raw_args)
+
+    start_date = datetime.datetime.fromisoformat(args.date) if args.date else datetime.datetime.now()
+    if args.tasks == "-":
+        tasks = list(iter_tasks(sys.stdin))
+    else:
+        with open(args.tasks, "r", encoding="utf-8") as f:
+            tasks = list(iter_tasks(f))
+    sweep_input = SweepInput(tasks, start_date, args.days)
+    for path in args.busy:
+        import_ics_busy(path, sweep_input, sweep_input.start_date, sweep_input.end_date)
+
+    axes = {name: getattr(args, name) for name in SWEEP_AXES}
+    weight_variants = [load_weight_variant(spec, args.weights_user) for spec in args.weights]
+    variants = build_variants(DEFAULT_SETTINGS, axes, weight_variants)
+    if not variants:
+        print("No valid variants (work_start_hour must be < work_end_hour)", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    results = run_sweep(sweep_input, variants, args.processes)
+    if args.output_format == "jsonl":
+        for result in results:
+            print(json.dumps(result.as_dict(), ensure_ascii=False))
+    else:
+        print(format_report(results))
+    print(f"{len(variants)} variants, {len(tasks)} tasks, {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
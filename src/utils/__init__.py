@@ -1 +1,30 @@
-from .parser import *
\ No newline at end of file
+"""
+Parser, writer và iCalendar. Các hàm được import lazily theo module (PEP 562) để CLI chỉ
+import phần nó dùng, ví dụ exporter .ics chỉ khi --format ics hoặc --busy.
+"""
+import importlib
+
+_EXPORTS = {
+    "parser": ("add_settings_arguments", "build_arg_parser", "settings_from_args", "parse_args",
+               "is_recurrence_spec", "parse_task_line", "iter_tasks", "parse_tasks", "task_from_dict"),
+    "output": ("RESULT_FIELDS", "task_to_record", "write_results"),
+    "ical": ("PRODID", "CRLF", "WEEKDAY_CODES", "write_ics", "escape_text", "fold_line", "format_datetime", "iter_vevent_lines", "ICAL_PRIORITY",
+             "iter_unfolded_lines", "parse_ical_datetime", "parse_rrule", "iter_ics_events", "parse_ical_duration",
+             "expand_occurrences", "iter_busy_blocks", "import_ics_busy"),
+}
+
+_ORIGINS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_ORIGINS)
+
+
+def __getattr__(name):
+    module_name = _ORIGINS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_ORIGINS))
@@ -0,0 +1,314 @@
+import datetime
+import math
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from src.models import Task, Priority
+
+
+PRODID = "-//ai-based-time-manager//scheduler//VI"
+CRLF = "\r\n"
+
+# RFC 5545 PRIORITY: 1 = cao nhất, 9 = thấp nhất
+ICAL_PRIORITY = {
+    Priority.CRITICAL: 1,
+    Priority.HIGH: 3,
+    Priority.MEDIUM: 5,
+    Priority.LOW: 9,
+}
+
+def escape_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold_line(line: str) -> str:
+    """
+    Gập dòng dài hơn 75 octet theo RFC 5545 (dòng tiếp theo bắt đầu bằng một dấu cách).
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + CRLF
+    chunks = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Không cắt giữa một ký tự UTF-8 nhiều byte
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        chunks.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+        limit = 74
+    return (CRLF + " ").join(chunks) + CRLF
+
+def format_datetime(value: datetime.datetime) -> str:
+    if value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return value.strftime("%Y%m%dT%H%M%S")
+
+def iter_vevent_lines(task: Task, dtstamp: str, localize: Optional[Callable] = None) -> Iterator[str]:
+    # localize: đổi datetime naive (giờ local của user) sang datetime có tz, khi user có timezone
+    start, end = task.scheduled_start, task.scheduled_end
+    if localize is not None:
+        start, end = localize(start), localize(end)
+    yield "BEGIN:VEVENT"
+    yield f"UID:task-{task.id}-{format_datetime(start)}@ai-time-manager"
+    yield f"DTSTAMP:{dtstamp}"
+    yield f"DTSTART:{format_datetime(start)}"
+    yield f"DTEND:{format_datetime(end)}"
+    yield f"SUMMARY:{escape_text(task.description)}"
+    yield f"PRIORITY:{ICAL_PRIORITY.get(task.priority, 0)}"
+    yield f"X-TASK-ID:{task.id}"
+    yield f"X-TASK-PRIORITY:{task.priority.name}"
+    if task.project_id:
+        yield f"X-PROJECT-ID:{escape_text(task.project_id)}"
+        yield f"CATEGORIES:{escape_text(task.project_id)}"
+    if task.due_date:
+        yield f"X-DUE-DATE:{format_datetime(localize(task.due_date) if localize is not None else task.due_date)}"
+    yield "END:VEVENT"
+
+def write_ics(tasks: Iterable[Task], output: TextIO, calendar_name: str = "AI Time Manager",
+              localize: Optional[Callable] = None) -> int:
+    """
+    Stream một VCALENDAR ra `output`, mỗi task đã lên lịch là một VEVENT.
+    Tasks are consumed lazily and each event is written as soon as it is formatted, so memory
+    does not grow with the number of events. Unscheduled tasks are skipped. Returns the event count.
+    """
+    dtstamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output.write("BEGIN:VCALENDAR" + CRLF)
+    output.write("VERSION:2.0" + CRLF)
+    output.write(fold_line(f"PRODID:{PRODID}"))
+    output.write("CALSCALE:GREGORIAN" + CRLF)
+    output.write(fold_line(f"X-WR-CALNAME:{escape_text(calendar_name)}"))
+    count = 0
+    for task in tasks:
+        if not task.scheduled_start or not task.scheduled_end:
+            continue
+        output.write("".join(fold_line(line) for line in iter_vevent_lines(task, dtstamp, localize)))
+        count += 1
+    output.write("END:VCALENDAR" + CRLF)
+    return count
+
+
+# --- Import ---
+
+WEEKDAY_CODES = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+def iter_unfolded_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Nối lại các dòng bị gập (dòng bắt đầu bằng dấu cách/tab) khi đọc stream .ics.
+    """
+    current = None
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+def parse_ical_datetime(value: str, params: str = "", zone=None) -> Tuple[datetime.datetime, bool]:
+    """
+    Trả về (datetime naive theo giờ local, is_all_day). UTC values ("Z") are converted to local
+    time: the user's `zone` (a tzinfo) when given, else the system zone. With `zone`, TZID values
+    are converted from their own zone too; without it they are taken as local wall-clock time.
+    """
+    is_date = "VALUE=DATE" in params.upper() and "VALUE=DATE-TIME" not in params.upper()
+    if is_date or len(value) == 8:
+        return datetime.datetime.strptime(value[:8], "%Y%m%d"), True
+    if value.endswith("Z"):
+        utc = datetime.datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=datetime.timezone.utc)
+        return utc.astimezone(zone).replace(tzinfo=None), False
+    local = datetime.datetime.strptime(value, "%Y%m%dT%H%M%S")
+    if zone is not None and "TZID=" in params.upper():
+        tzid = params[params.upper().index("TZID=") + 5:].split(";")[0].strip('"')
+        try:
+            source_zone = ZoneInfo(tzid)
+        except (ZoneInfoNotFoundError, ValueError):
+            return local, False
+        if str(source_zone) != str(zone):
+            return local.replace(tzinfo=source_zone).astimezone(zone).replace(tzinfo=None), False
+    return local, False
+
+def parse_rrule(value: str) -> Dict[str, str]:
+    rule = {}
+    for part in value.split(";"):
+        if "=" in part:
+            key, val = part.split("=", 1)
+            rule[key.upper()] = val
+    return rule
+
+def iter_ics_events(lines: Iterable[str], zone=None) -> Iterator[Dict]:
+    """
+    Stream các VEVENT dưới dạng dict {"start", "end", "all_day", "rrule", "exdates", "summary", "uid"}.
+    Only the current event is held in memory; cancelled and transparent (free) events are skipped.
+    """
+    event = None
+    for line in iter_unfolded_lines(lines):
+        if line == "BEGIN:VEVENT":
+            event = {"start": None, "end": None, "duration": None, "all_day": False,
+                     "rrule": None, "exdates": [], "summary": "", "uid": None, "skip": False}
+            continue
+        if event is None:
+            continue
+        if line == "END:VEVENT":
+            if event["start"] is not None and not event["skip"]:
+                if event["end"] is None:
+                    if event["duration"] is not None:
+                        event["end"] = event["start"] + event["duration"]
+                    elif event["all_day"]:
+                        event["end"] = event["start"] + datetime.timedelta(days=1)
+                    else:
+                        event["end"] = event["start"]
+                del event["duration"], event["skip"]
+                yield event
+            event = None
+            continue
+        name, _, value = line.partition(":")
+        name, _, params = name.partition(";")
+        name = name.upper()
+        try:
+            if name == "DTSTART":
+                event["start"], event["all_day"] = parse_ical_datetime(value, params, zone)
+            elif name == "DTEND":
+                event["end"], _ = parse_ical_datetime(value, params, zone)
+            elif name == "DURATION":
+                event["duration"] = parse_ical_duration(value)
+            elif name == "RRULE":
+                event["rrule"] = parse_rrule(value)
+            elif name == "EXDATE":
+                event["exdates"].extend(parse_ical_datetime(v, params, zone)[0] for v in value.split(","))
+            elif name == "SUMMARY":
+                event["summary"] = value
+            elif name == "UID":
+                event["uid"] = value
+            elif name == "STATUS" and value.upper() == "CANCELLED":
+                event["skip"] = True
+            elif name == "TRANSP" and value.upper() == "TRANSPARENT":
+                event["skip"] = True
+        except ValueError:
+            event["skip"] = True
+
+def parse_ical_duration(value: str) -> datetime.timedelta:
+    """
+    Parse RFC 5545 DURATION như "PT1H30M", "P1D", "P2W".
+    """
+    sign = -1 if value.startswith("-") else 1
+    value = value.lstrip("+-")
+    if not value.startswith("P"):
+        raise ValueError(f"Invalid duration: {value}")
+    total = datetime.timedelta()
+    number = ""
+    in_time = False
+    units = {"W": "weeks", "D": "days", "H": "hours", "M": "minutes", "S": "seconds"}
+    for ch in value[1:]:
+        if ch == "T":
+            in_time = True
+        elif ch.isdigit():
+            number += ch
+        elif ch in units and number:
+            if ch == "M" and not in_time:
+                raise ValueError(f"Invalid duration: {value}")
+            total += datetime.timedelta(**{units[ch]: int(number)})
+            number = ""
+        else:
+            raise ValueError(f"Invalid duration: {value}")
+    return sign * total
+
+def expand_occurrences(start: datetime.datetime, end: datetime.datetime, rrule: Optional[Dict[str, str]],
+                       window_start: datetime.datetime, window_end: datetime.datetime,
+                       exdates: Optional[List[datetime.datetime]] = None) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+    """
+    Sinh các lần lặp của một event nằm trong [window_start, window_end).
+    Supports FREQ=DAILY/WEEKLY with INTERVAL, COUNT, UNTIL and BYDAY. Periods before the
+    window are skipped arithmetically, so a rule that started years ago costs O(1) to reach the window.
+    Other frequencies only yield the first occurrence.
+    """
+    duration = end - start
+    excluded = set(exdates or ())
+    if not rrule or rrule.get("FREQ") not in ("DAILY", "WEEKLY"):
+        if start < window_end and start + duration > window_start and start not in excluded:
+            yield start, start + duration
+        return
+
+    interval = max(1, int(rrule.get("INTERVAL", "1")))
+    count = int(rrule["COUNT"]) if "COUNT" in rrule else None
+    until = None
+    if "UNTIL" in rrule:
+        until, _ = parse_ical_datetime(rrule["UNTIL"])
+        if len(rrule["UNTIL"]) == 8:
+            until += datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+
+    days = sorted({WEEKDAY_CODES[d[-2:].upper()] for d in rrule.get("BYDAY", "").split(",") if d[-2:].upper() in WEEKDAY_CODES})
+    if rrule["FREQ"] == "DAILY" and days:
+        # BYDAY giới hạn các ngày của DAILY: thứ trong tuần lặp lại sau lcm(INTERVAL, 7) ngày
+        steps = 7 // math.gcd(interval, 7)
+        period = datetime.timedelta(days=interval * steps)
+        offsets = [datetime.timedelta(days=step * interval) for step in range(steps)
+                   if (start + datetime.timedelta(days=step * interval)).weekday() in days]
+        first_period = start
+    elif rrule["FREQ"] == "DAILY":
+        period = datetime.timedelta(days=interval)
+        offsets = [datetime.timedelta()]
+        first_period = start
+    else:
+        period = datetime.timedelta(weeks=interval)
+        if not days:
+            days = [start.weekday()]
+        # Tuần chứa DTSTART, tính từ thứ Hai
+        first_period = start - datetime.timedelta(days=start.weekday())
+        offsets = [datetime.timedelta(days=d) for d in days]
+
+    # Số lần lặp trong period đầu tiên (bỏ các ngày trước DTSTART)
+    first_offsets = [o for o in offsets if first_period + o >= start]
+    seen = 0
+    period_index = 0
+    # Nhảy thẳng tới period gần window nhất
+    earliest = window_start - duration
+    if earliest > first_period + period:
+        period_index = max(0, (earliest - first_period) // period - 1)
+        if period_index > 0:
+            seen = len(first_offsets) + (period_index - 1) * len(offsets)
+
+    while True:
+        period_start = first_period + period_index * period
+        if period_start >= window_end or (until is not None and period_start > until):
+            return
+        for offset in (first_offsets if period_index == 0 else offsets):
+            occurrence = period_start + offset
+            if count is not None and seen >= count:
+                return
+            if until is not None and occurrence > until:
+                return
+            seen += 1
+            if occurrence >= window_end:
+                return
+            if occurrence + duration > window_start and occurrence not in excluded:
+                yield occurrence, occurrence + duration
+        period_index += 1
+
+def iter_busy_blocks(lines: Iterable[str], window_start: datetime.datetime,
+                     window_end: datetime.datetime, zone=None) -> Iterator[Tuple[datetime.datetime, datetime.datetime]]:
+    for event in iter_ics_events(lines, zone):
+        if event["end"] <= event["start"]:
+            continue
+        yield from expand_occurrences(event["start"], event["end"], event["rrule"],
+                                      window_start, window_end, event["exdates"])
+
+def import_ics_busy(source, calendar_manager, window_start: datetime.datetime,
+                    window_end: datetime.datetime, zone=None) -> int:
+    """
+    Import các VEVENT từ file .ics (đường dẫn hoặc stream) làm khoảng bận của CalendarManager.
+    Recurring events are expanded only inside [window_start, window_end). Times are converted to
+    `zone`, defaulting to the CalendarManager's timezone if it has one. Returns the number of
+    busy blocks read (before merging).
+    """
+    if zone is None and getattr(calendar_manager, "timezone", None) is not None:
+        zone = calendar_manager.timezone.zone
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            return import_ics_busy(f, calendar_manager, window_start, window_end, zone)
+    blocks = list(iter_busy_blocks(source, window_start, window_end, zone))
+    calendar_manager.add_busy_blocks(blocks)
+    return len(blocks)
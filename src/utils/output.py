@@ -0,0 +1,74 @@
+import csv
+import json
+from typing import Callable, Dict, Iterable, Optional, TextIO
+from src.models import Task
+
+
+RESULT_FIELDS = [
+    "id", "description", "duration_minutes", "priority", "project_id",
+    "due_date", "status", "scheduled_start", "scheduled_end", "occurrence_date", "depends_on",
+    "preferred_time", "energy_level", "recurrence",
+]
+
+def task_to_record(task: Task, localize: Optional[Callable] = None) -> Dict:
+    """
+    Chuyển một task thành dict (str/int/None, depends_on là list id) để xuất ra file.
+    The record round-trips through parser.task_from_dict (every field that affects scoring is kept). `localize` turns the scheduler's naive local datetimes into tz-aware ones (ISO with offset).
+    """
+    if localize is not None:
+        due_date, start, end = localize(task.due_date), localize(task.scheduled_start), localize(task.scheduled_end)
+    else:
+        due_date, start, end = task.due_date, task.scheduled_start, task.scheduled_end
+    return {
+        "id": task.id,
+        "description": task.description,
+        "duration_minutes": task.duration_minutes,
+        "priority": task.priority.name,
+        "project_id": task.project_id,
+        "due_date": due_date.isoformat() if due_date else None,
+        "status": "scheduled" if task.scheduled_start else "unscheduled",
+        "scheduled_start": start.isoformat() if start else None,
+        "scheduled_end": end.isoformat() if end else None,
+        "occurrence_date": task.occurrence_date.isoformat() if task.occurrence_date else None,
+        "depends_on": list(task.depends_on) or None,
+        "preferred_time": task.preferred_time,
+        "energy_level": task.energy_level,
+        "recurrence": task.recurrence.to_string() if task.recurrence is not None else None,
+    }
+
+def _csv_row(record: Dict) -> Dict:
+    # CSV chỉ có ô phẳng: danh sách phụ thuộc ghi thành các id cách nhau bởi dấu cách
+    if record["depends_on"]:
+        record["depends_on"] = " ".join(str(dep) for dep in record["depends_on"])
+    return record
+
+def write_results(tasks: Iterable[Task], output: TextIO, output_format: str = "json",
+                  localize: Optional[Callable] = None) -> int:
+    """
+    Ghi kết quả lên lịch ra một stream duy nhất theo định dạng json | jsonl | csv.
+    Records are written one at a time, so the caller controls buffering. Returns the record count.
+    """
+    count = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=RESULT_FIELDS, lineterminator="\n")
+        writer.writeheader()
+        for task in tasks:
+            writer.writerow(_csv_row(task_to_record(task, localize)))
+            count += 1
+    elif output_format == "jsonl":
+        for task in tasks:
+            output.write(json.dumps(task_to_record(task, localize), ensure_ascii=False))
+            output.write("\n")
+            count += 1
+    elif output_format == "json":
+        output.write("[")
+        for task in tasks:
+            if count:
+                output.write(",")
+            output.write("\n")
+            output.write(json.dumps(task_to_record(task, localize), ensure_ascii=False))
+            count += 1
+        output.write("\n]\n")
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return count
@@ -1,78 +1,198 @@
 import argparse
 import datetime
-from src.models import Task, Priority
+import re
+from typing import Iterable, Iterator, List, Optional, Union
+from src.models import Task, Priority, RecurrenceRule
 
 
-def parse_args(raw_args=None):
-    parser = argparse.ArgumentParser(description='Time-manager')
+def add_settings_arguments(parser):
     parser.add_argument('--work_start_hour', type=int, default=9)
     parser.add_argument('--work_end_hour', type=int, default=17)
     parser.add_argument('--min_buffer_minutes', type=int, default=15)
     parser.add_argument('--slot_duration_minutes', type=int, default=30)
     parser.add_argument('--group_by_project', type=bool, default=True)
-    args = parser.parse_args(raw_args)
-    return {
+    parser.add_argument('--weights_file', default=None, help="Learned scoring weights (see src.training.fit_weights)")
+    parser.add_argument('--weights_user', default=None, help="User whose weights to use from --weights_file")
+    parser.add_argument('--placement', choices=['slot', 'gap'], default=None,
+                        help="'gap': try the best start time inside each free gap instead of fixed hourly slots")
+    parser.add_argument('--timezone', default=None,
+                        help="IANA zone of the user (e.g. Europe/Berlin); work hours are local to it, output carries offsets")
+    return parser
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description='Time-manager')
+    add_settings_arguments(parser)
+    # Batch mode: đọc task từ file/stdin, không hỏi tương tác
+    parser.add_argument('--tasks', default=None, help="Task file, or '-' for stdin (enables batch mode)")
+    parser.add_argument('--date', default=None, help="First day to schedule (YYYY-MM-DD), default today")
+    parser.add_argument('--days', type=int, default=1, help="Number of consecutive days to schedule")
+    parser.add_argument('--format', dest='output_format', choices=['json', 'jsonl', 'csv', 'ics'], default='json')
+    parser.add_argument('--busy', action='append', default=[], help="iCalendar file of busy time (repeatable)")
+    parser.add_argument('--events', default=None, help="Write scheduling events as JSON lines to FILE, or '-' for stderr")
+    parser.add_argument('--event_level', choices=['debug', 'info', 'warning'], default='info')
+    parser.add_argument('--cache', default=None, help="Persistent schedule result cache file (JSON)")
+    parser.add_argument('--profile', action='store_true', help="Print per-phase timings and counters to stderr")
+    parser.add_argument('--decision_log', default=None, help="Append candidate factor vectors of each placement to FILE (JSON lines)")
+    parser.add_argument('--validate', choices=['report', 'merge'], default=None,
+                        help="Check pre-scheduled tasks for conflicts before scheduling; 'merge' also blocks conflicting spans")
+    parser.add_argument('--capacity_report', action='store_true',
+                        help="Before scheduling, print free minutes per day and deadlines whose pending demand exceeds them (stderr)")
+    parser.add_argument('--top_k', type=int, default=None,
+                        help="Stream tasks keeping at most N candidates per day in memory (overflow spills to disk)")
+    parser.add_argument('--output', default='-', help="Output file, or '-' for stdout")
+    return parser
+
+def settings_from_args(args):
+    settings = {
         "work_start_hour": getattr(args, "work_start_hour", 9),
         "work_end_hour": getattr(args, "work_end_hour", 17),
         "min_buffer_minutes": getattr(args, "min_buffer_minutes", 15),
         "slot_duration_minutes": getattr(args, "slot_duration_minutes", 30),
         "group_by_project": getattr(args, "group_by_project", True)
     }
+    # Chỉ thêm khi có, để settings mặc định (và khóa cache) không đổi
+    for key in ("weights_file", "weights_user", "timezone", "placement"):
+        if getattr(args, key, None):
+            settings[key] = getattr(args, key)
+    return settings
+
+def parse_args(raw_args=None):
+    args = build_arg_parser().parse_args(raw_args)
+    return settings_from_args(args)
+
+def is_recurrence_spec(value: str) -> bool:
+    head = value.strip().upper()
+    return "FREQ=" in head or head.split(";")[0] in ("DAILY", "WEEKLY")
+
+_DEPENDENCY_SEPARATORS = re.compile(r"[\s,;]+")
+_DEPENDENCY_COLUMN = re.compile(r"^\d+(?:[\s;]+\d+)*$")
+
+def parse_dependency_ids(value: Union[str, Iterable, None]) -> List[int]:
+    """
+    Danh sách id phụ thuộc từ một list/tuple id hoặc một chuỗi "1 2", "1,2", "1;2".
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [dep for dep in _DEPENDENCY_SEPARATORS.split(value.strip()) if dep]
+    return [int(dep) for dep in value]
+
+def parse_task_line(line: str) -> Optional[Task]:
+    """
+    Parse a single CSV task line. Returns None for blank or malformed lines.
+    Column 10 is depends_on (ids separated by spaces or ';') followed by recurrence; a recurrence
+    rule directly in column 10 (the older layout) is still accepted.
+    """
+    parts = [p.strip() for p in line.split(',')]
+    if len(parts) < 4:
+        return None
+    try:
+        id = int(parts[0])
+        description = parts[1]
+        duration_minutes = int(parts[2])
+        priority = Priority[parts[3].upper()]
+        due_date = None
+        preferred_time = None
+        energy_level = None
+        project_id = None
+        scheduled_start = None
+        scheduled_end = None
+        if len(parts) > 4 and parts[4]:
+            due_date = datetime.datetime.fromisoformat(parts[4])
+        if len(parts) > 5 and parts[5]:
+            preferred_time = parts[5]
+        if len(parts) > 6 and parts[6]:
+            energy_level = parts[6]
+        if len(parts) > 7 and parts[7]:
+            project_id = parts[7]
+        if len(parts) > 8 and parts[8]:
+            scheduled_start = datetime.datetime.fromisoformat(parts[8])
+        if len(parts) > 9 and parts[9]:
+            scheduled_end = datetime.datetime.fromisoformat(parts[9])
+        depends_on = []
+        rest = parts[10:]
+        if rest and not is_recurrence_spec(rest[0]):
+            # Cột không phải danh sách id (dòng cũ có cột thừa) bị bỏ qua như trước
+            if _DEPENDENCY_COLUMN.match(rest[0]):
+                depends_on = parse_dependency_ids(rest[0])
+            rest = rest[1:]
+        recurrence = None
+        if rest and is_recurrence_spec(rest[0]):
+            # Cột cuối là luật lặp lại; BYDAY có thể chứa dấu phẩy nên ghép lại phần còn lại
+            anchor = scheduled_start or due_date
+            recurrence = RecurrenceRule.from_string(",".join(rest), anchor.date() if anchor else None)
+        return Task(
+            id=id,
+            description=description,
+            duration_minutes=duration_minutes,
+            priority=priority,
+            due_date=due_date,
+            preferred_time=preferred_time,
+            energy_level=energy_level,
+            project_id=project_id,
+            scheduled_start=scheduled_start,
+            scheduled_end=scheduled_end,
+            recurrence=recurrence,
+            depends_on=depends_on
+        )
+    except Exception:
+        return None
+
+def iter_tasks(lines: Iterable[str]) -> Iterator[Task]:
+    """
+    Lazily parse tasks from any iterable of lines (open file, sys.stdin, ...).
+    Malformed lines (including a trailing "done") are skipped.
+    """
+    for line in lines:
+        task = parse_task_line(line)
+        if task is not None:
+            yield task
 
 def parse_tasks(input_data):
     """
     Parse tasks from a string (single line) or from a file.
-    Format: id,description,duration,priority,due_date,preferred_time,energy_level,project_id,scheduled_start,scheduled_end
+    Format: id,description,duration,priority,due_date,preferred_time,energy_level,project_id,scheduled_start,scheduled_end,depends_on,recurrence
     Only id, description, duration, priority are required. Others are optional.
+    depends_on lists task ids separated by spaces or ';' (e.g. "3 7"); it may be omitted before recurrence.
+    recurrence is a short RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=2025-12-31
     """
-    tasks = []
     if isinstance(input_data, str) and input_data.endswith('.txt'):
         with open(input_data, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+            tasks = list(iter_tasks(f))
     elif isinstance(input_data, str):
-        lines = [input_data]
+        task = parse_task_line(input_data)
+        tasks = [task] if task is not None else []
     else:
         return []
-    for line in lines:
-        parts = [p.strip() for p in line.split(',')]
-        if len(parts) < 4:
-            continue
-        try:
-            id = int(parts[0])
-            description = parts[1]
-            duration_minutes = int(parts[2])
-            priority = Priority[parts[3].upper()]
-            due_date = None
-            preferred_time = None
-            energy_level = None
-            project_id = None
-            scheduled_start = None
-            scheduled_end = None
-            if len(parts) > 4 and parts[4]:
-                due_date = datetime.datetime.fromisoformat(parts[4])
-            if len(parts) > 5 and parts[5]:
-                preferred_time = parts[5]
-            if len(parts) > 6 and parts[6]:
-                energy_level = parts[6]
-            if len(parts) > 7 and parts[7]:
-                project_id = parts[7]
-            if len(parts) > 8 and parts[8]:
-                scheduled_start = datetime.datetime.fromisoformat(parts[8])
-            if len(parts) > 9 and parts[9]:
-                scheduled_end = datetime.datetime.fromisoformat(parts[9])
-            task = Task(
-                id=id,
-                description=description,
-                duration_minutes=duration_minutes,
-                priority=priority,
-                due_date=due_date,
-                preferred_time=preferred_time,
-                energy_level=energy_level,
-                project_id=project_id,
-                scheduled_start=scheduled_start,
-                scheduled_end=scheduled_end
-            )
-            tasks.append(task)
-        except Exception:
-            continue
     return tasks if len(tasks) > 1 else (tasks[0] if tasks else None)
+
+def task_from_dict(data: dict) -> Task:
+    """
+    Build a Task from a JSON-style dict (the shape produced by task_to_record).
+    Datetimes are ISO 8601 strings; `recurrence` is a short RRULE string; `depends_on` is a list
+    of ids or a string of ids separated by spaces or commas.
+    """
+    def parse_datetime(value):
+        return datetime.datetime.fromisoformat(value) if value else None
+
+    scheduled_start = parse_datetime(data.get("scheduled_start"))
+    due_date = parse_datetime(data.get("due_date"))
+    recurrence = None
+    if data.get("recurrence"):
+        anchor = scheduled_start or due_date
+        recurrence = RecurrenceRule.from_string(data["recurrence"], anchor.date() if anchor else None)
+    priority = data.get("priority", "MEDIUM")
+    return Task(
+        id=int(data["id"]),
+        description=data.get("description", ""),
+        duration_minutes=int(data["duration_minutes"]),
+        priority=Priority[priority.upper()] if isinstance(priority, str) else Priority(priority),
+        due_date=due_date,
+        preferred_time=data.get("preferred_time") or None,
+        energy_level=data.get("energy_level") or None,
+        project_id=data.get("project_id") or None,
+        scheduled_start=scheduled_start,
+        scheduled_end=parse_datetime(data.get("scheduled_end")),
+        recurrence=recurrence,
+        depends_on=parse_dependency_ids(data.get("depends_on")),
+    )